@@ -1,16 +1,44 @@
 import os
+import json
+import base64
+import hashlib
+import csv
 import sqlite3
+import tempfile
+import itertools
+import queue
+import multiprocessing
+import threading
+import time
+import uuid
+import click
+import zipfile
+import numpy as np
 import pandas as pd
 import smtplib
 import logging
+import gzip
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, date
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
-from io import BytesIO
-from flask import Flask, render_template_string, request, redirect, url_for, flash, send_file, jsonify
+from io import BytesIO, RawIOBase
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, send_file, send_from_directory, jsonify, stream_with_context
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from reportlab import rl_config
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import inch
@@ -19,1234 +47,149 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 
+# PDF streams are Flate-compressed only; the extra ASCII85 layer is for 7-bit
+# transports, costs a pure-Python pass per PDF and inflates files by a quarter
+rl_config.useA85 = 0
+
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "your-secret-key-here")
 app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Upload limit in MB; uploads are parsed in chunks so this only guards disk use
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_UPLOAD_MB',
+                                                      256)) * 1024 * 1024
+app.config['UPLOAD_CHUNK_ROWS'] = int(os.environ.get('UPLOAD_CHUNK_ROWS', 5000))
+app.config['DATABASE'] = os.environ.get('DATABASE_PATH', 'payroll.db')
+# Processes used to render payslip PDFs; 1 renders in the request thread.
+# Each worker imports the whole app (~100MB), so the default stays small
+app.config['PAYSLIP_RENDER_WORKERS'] = int(
+    os.environ.get('PAYSLIP_RENDER_WORKERS', min(4, os.cpu_count() or 1)))
+
+# Outgoing mail. There are no default credentials: sending payslips fails
+# with a clear error until MAIL_USERNAME and MAIL_PASSWORD are set, or
+# MAIL_USE_AUTH is turned off for a relay that takes no login
+app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
+app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS',
+                                            'true').lower() in ('1', 'true',
+                                                                'yes')
+app.config['MAIL_USE_AUTH'] = os.environ.get('MAIL_USE_AUTH',
+                                             'true').lower() in ('1', 'true',
+                                                                 'yes')
+app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME', '')
+app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD', '')
+app.config['MAIL_SENDER'] = os.environ.get('MAIL_SENDER',
+                                           app.config['MAIL_USERNAME'])
+app.config['MAIL_TIMEOUT'] = int(os.environ.get('MAIL_TIMEOUT', 30))
+# Authenticated sessions sending in parallel per batch, and messages sent on
+# each before it is recycled (providers cap messages per connection)
+app.config['MAIL_SESSIONS'] = int(os.environ.get('MAIL_SESSIONS', 1))
+app.config['MAIL_MESSAGES_PER_SESSION'] = int(
+    os.environ.get('MAIL_MESSAGES_PER_SESSION', 100))
+
+# Sends per minute allowed by the SMTP provider (0 for no limit), shared by
+# all MAIL_SESSIONS senders, and how many may go out back to back
+app.config['MAIL_RATE_PER_MINUTE'] = float(
+    os.environ.get('MAIL_RATE_PER_MINUTE', 0))
+app.config['MAIL_RATE_BURST'] = int(os.environ.get('MAIL_RATE_BURST', 0)) or None
+# Payslip emails that fail transiently are retried with exponential backoff,
+# MAIL_RETRY_BASE_SECONDS doubling per attempt, up to MAIL_MAX_ATTEMPTS tries
+app.config['MAIL_MAX_ATTEMPTS'] = int(os.environ.get('MAIL_MAX_ATTEMPTS', 5))
+app.config['MAIL_RETRY_BASE_SECONDS'] = int(
+    os.environ.get('MAIL_RETRY_BASE_SECONDS', 30))
+
+# Cache-Control sent with conditional JSON responses. The payloads carry
+# salaries, so only the browser keeps them, and no-cache makes every reuse
+# revalidate through the ETag (a cheap 304) so reprocessed payroll shows up
+# at once
+app.config['API_CACHE_CONTROL'] = os.environ.get('API_CACHE_CONTROL',
+                                                 'private, no-cache')
+
+# Background job threads started per process; 0 leaves jobs to a separate
+# `flask run-job-worker` process
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 1))
+app.config['JOB_POLL_SECONDS'] = float(os.environ.get('JOB_POLL_SECONDS', 2))
+# A running job whose heartbeat is older than this is assumed to have died
+# with its worker and is picked up again
+app.config['JOB_STALE_SECONDS'] = int(os.environ.get('JOB_STALE_SECONDS', 300))
+
+# Rendered payslips are cached on disk up to PAYSLIP_CACHE_MAX_MB
+app.config['PAYSLIP_CACHE_DIR'] = os.environ.get('PAYSLIP_CACHE_DIR',
+                                                 'payslip_cache')
+app.config['PAYSLIP_CACHE_MAX_MB'] = int(
+    os.environ.get('PAYSLIP_CACHE_MAX_MB', 512))
+# Let the front-end server (nginx X-Accel or Apache mod_xsendfile) stream
+# cached payslips instead of the Python worker
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE',
+                                              'false').lower() in ('1', 'true',
+                                                                   'yes')
+
+# Rows per Parquet row group / Arrow record batch in payroll history exports
+app.config['EXPORT_BATCH_ROWS'] = int(
+    os.environ.get('EXPORT_BATCH_ROWS', 65536))
+
+# HTML, JSON, CSS and JS responses at least this large are gzip- (or brotli-)
+# compressed when the client accepts it
+app.config['COMPRESS_MIN_BYTES'] = int(
+    os.environ.get('COMPRESS_MIN_BYTES', 1024))
+app.config['COMPRESS_LEVEL'] = int(os.environ.get('COMPRESS_LEVEL', 6))
+# Static files requested through static_url() carry a content hash, so they
+# can be cached for a year without revalidation
+app.config['STATIC_IMMUTABLE_MAX_AGE'] = 365 * 24 * 60 * 60
 
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# HTML Template with embedded CSS and JS
-HTML_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>PayrollPro - Dashboard</title>
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css" rel="stylesheet">
-    <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/css/all.min.css" rel="stylesheet">
-    <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-    <style>
-        :root {
-            --primary-color: #2c3e50;
-            --secondary-color: #3498db;
-            --success-color: #27ae60;
-            --warning-color: #f39c12;
-            --danger-color: #e74c3c;
-            --light-bg: #f8f9fa;
-            --card-shadow: 0 0.125rem 0.25rem rgba(0,0,0,0.075);
-        }
-
-        body {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-        }
-
-        .dashboard-container {
-            background: white;
-            margin: 20px;
-            border-radius: 15px;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.1);
-            overflow: hidden;
-        }
-
-        .header {
-            background: linear-gradient(135deg, var(--primary-color) 0%, var(--secondary-color) 100%);
-            color: white;
-            padding: 30px;
-            text-align: center;
-        }
-
-        .header h1 {
-            margin: 0;
-            font-size: 2.5rem;
-            font-weight: 300;
-        }
-
-        .header p {
-            margin: 10px 0 0 0;
-            opacity: 0.9;
-        }
-
-        .stats-row {
-            padding: 30px;
-            background: var(--light-bg);
-        }
-
-        .stat-card {
-            background: white;
-            border-radius: 12px;
-            padding: 25px;
-            text-align: center;
-            box-shadow: var(--card-shadow);
-            transition: transform 0.3s ease, box-shadow 0.3s ease;
-            border-left: 4px solid;
-            margin-bottom: 20px;
-        }
-
-        .stat-card:hover {
-            transform: translateY(-5px);
-            box-shadow: 0 8px 25px rgba(0,0,0,0.15);
-        }
-
-        .stat-card.employees { border-left-color: var(--secondary-color); }
-        .stat-card.payroll { border-left-color: var(--success-color); }
-        .stat-card.pending { border-left-color: var(--warning-color); }
-        .stat-card.total { border-left-color: var(--danger-color); }
-
-        .stat-card i {
-            font-size: 2.5rem;
-            margin-bottom: 15px;
-            opacity: 0.8;
-        }
-
-        .stat-card h3 {
-            font-size: 2rem;
-            font-weight: bold;
-            margin: 0;
-        }
-
-        .stat-card p {
-            margin: 0;
-            color: #666;
-            font-size: 0.9rem;
-        }
-
-        .main-content {
-            padding: 30px;
-        }
-
-        .section-card {
-            background: white;
-            border-radius: 12px;
-            padding: 25px;
-            margin-bottom: 30px;
-            box-shadow: var(--card-shadow);
-            border: 1px solid #e9ecef;
-        }
-
-        .section-title {
-            color: var(--primary-color);
-            font-size: 1.3rem;
-            font-weight: 600;
-            margin-bottom: 20px;
-            padding-bottom: 10px;
-            border-bottom: 2px solid #e9ecef;
-        }
-
-        .btn-custom {
-            border-radius: 8px;
-            padding: 10px 20px;
-            font-weight: 500;
-            transition: all 0.3s ease;
-            border: none;
-            margin: 5px;
-        }
-
-        .btn-primary-custom {
-            background: linear-gradient(135deg, var(--secondary-color) 0%, #2980b9 100%);
-            color: white;
-        }
-
-        .btn-primary-custom:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 4px 12px rgba(52, 152, 219, 0.4);
-            color: white;
-        }
-
-        .btn-success-custom {
-            background: linear-gradient(135deg, var(--success-color) 0%, #219a52 100%);
-            color: white;
-        }
-
-        .btn-success-custom:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 4px 12px rgba(39, 174, 96, 0.4);
-            color: white;
-        }
-
-        .btn-warning-custom {
-            background: linear-gradient(135deg, var(--warning-color) 0%, #d68910 100%);
-            color: white;
-        }
-
-        .btn-warning-custom:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 4px 12px rgba(243, 156, 18, 0.4);
-            color: white;
-        }
-
-        .btn-info-custom {
-            background: linear-gradient(135deg, #17a2b8 0%, #138496 100%);
-            color: white;
-        }
-
-        .btn-info-custom:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 4px 12px rgba(23, 162, 184, 0.4);
-            color: white;
-        }
-
-        .form-control, .form-select {
-            border-radius: 8px;
-            border: 1px solid #ddd;
-            padding: 12px;
-            transition: all 0.3s ease;
-        }
-
-        .form-control:focus, .form-select:focus {
-            border-color: var(--secondary-color);
-            box-shadow: 0 0 0 0.2rem rgba(52, 152, 219, 0.25);
-        }
-
-        .table {
-            border-radius: 8px;
-            overflow: hidden;
-            box-shadow: var(--card-shadow);
-        }
-
-        .table thead {
-            background: var(--primary-color);
-            color: white;
-        }
-
-        .table tbody tr:hover {
-            background-color: rgba(52, 152, 219, 0.1);
-        }
-
-        .alert {
-            border-radius: 8px;
-            border: none;
-            box-shadow: var(--card-shadow);
-        }
-
-        .modal-content {
-            border-radius: 12px;
-            border: none;
-            box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-        }
-
-        .modal-header {
-            background: var(--primary-color);
-            color: white;
-            border-radius: 12px 12px 0 0;
-        }
-
-        .file-upload-area {
-            border: 2px dashed #ddd;
-            border-radius: 8px;
-            padding: 30px;
-            text-align: center;
-            background: #f8f9fa;
-            transition: all 0.3s ease;
-        }
-
-        .file-upload-area:hover {
-            border-color: var(--secondary-color);
-            background: rgba(52, 152, 219, 0.1);
-        }
-
-        .chart-container {
-            position: relative;
-            height: 300px;
-            margin: 20px 0;
-        }
-
-        @media (max-width: 768px) {
-            .dashboard-container {
-                margin: 10px;
-            }
-            
-            .header {
-                padding: 20px;
-            }
-            
-            .header h1 {
-                font-size: 2rem;
-            }
-            
-            .stats-row, .main-content {
-                padding: 20px;
-            }
-        }
-    </style>
-</head>
-<body>
-    <div class="dashboard-container">
-        <!-- Header -->
-        <div class="header">
-            <h1><i class="fas fa-calculator"></i> PayrollPro</h1>
-            <p>Comprehensive Payroll Management System</p>
-        </div>
+MONTH_NAMES = [
+    'January', 'February', 'March', 'April', 'May', 'June', 'July', 'August',
+    'September', 'October', 'November', 'December'
+]
 
-        <!-- Flash Messages -->
-        {% with messages = get_flashed_messages(with_categories=true) %}
-            {% if messages %}
-                <div class="container mt-3">
-                    {% for category, message in messages %}
-                        <div class="alert alert-{{ 'danger' if category == 'error' else 'success' }} alert-dismissible fade show" role="alert">
-                            {{ message }}
-                            <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
-                        </div>
-                    {% endfor %}
-                </div>
-            {% endif %}
-        {% endwith %}
-
-        <!-- Statistics Row -->
-        <div class="stats-row">
-            <div class="row">
-                <div class="col-md-3">
-                    <div class="stat-card employees">
-                        <i class="fas fa-users text-info"></i>
-                        <h3>{{ total_employees }}</h3>
-                        <p>Total Employees</p>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="stat-card payroll">
-                        <i class="fas fa-money-bill-wave text-success"></i>
-                        <h3>{{ recent_payroll|length }}</h3>
-                        <p>Recent Payrolls</p>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="stat-card pending">
-                        <i class="fas fa-clock text-warning"></i>
-                        <h3>{{ monthly_stats|length }}</h3>
-                        <p>Monthly Records</p>
-                    </div>
-                </div>
-                <div class="col-md-3">
-                    <div class="stat-card total">
-                        <i class="fas fa-chart-line text-danger"></i>
-                        <h3>₹{{ "%.0f"|format(monthly_stats[0].total_payout if monthly_stats else 0) }}</h3>
-                        <p>Latest Month Payout</p>
-                    </div>
-                </div>
-            </div>
-        </div>
 
-        <!-- Main Content -->
-        <div class="main-content">
-            <div class="row">
-                <!-- Employee Management -->
-                <div class="col-lg-6">
-                    <div class="section-card">
-                        <h3 class="section-title"><i class="fas fa-user-plus"></i> Employee Management</h3>
-                        
-                        <!-- Add Single Employee -->
-                        <div class="mb-4">
-                            <button class="btn btn-primary-custom btn-custom" data-bs-toggle="modal" data-bs-target="#addEmployeeModal">
-                                <i class="fas fa-user-plus"></i> Add Employee
-                            </button>
-                            <button class="btn btn-success-custom btn-custom" data-bs-toggle="modal" data-bs-target="#bulkEmployeeModal">
-                                <i class="fas fa-upload"></i> Bulk Add
-                            </button>
-                            <a href="{{ url_for('download_employee_template') }}" class="btn btn-warning-custom btn-custom">
-                                <i class="fas fa-download"></i> Template
-                            </a>
-                        </div>
-
-                        <!-- Recent Employees -->
-                        <div class="table-responsive">
-                            <table class="table table-hover">
-                                <thead>
-                                    <tr>
-                                        <th>ID</th>
-                                        <th>Name</th>
-                                        <th>CTC</th>
-                                        <th>Department</th>
-                                        <th>Actions</th>
-                                    </tr>
-                                </thead>
-                                <tbody>
-                                    {% for emp in employees[:5] %}
-                                    <tr>
-                                        <td>{{ emp.emp_id }}</td>
-                                        <td>{{ emp.name }}</td>
-                                        <td>₹{{ "%.0f"|format(emp.ctc_monthly) }}</td>
-                                        <td>{{ emp.department or 'N/A' }}</td>
-                                        <td>
-                                            <button class="btn btn-sm btn-info-custom" onclick="viewEmployeeCostBreakdown('{{ emp.emp_id }}', '{{ emp.name }}', {{ emp.ctc_monthly }})">
-                                                <i class="fas fa-calculator"></i> View
-                                            </button>
-                                        </td>
-                                    </tr>
-                                    {% endfor %}
-                                </tbody>
-                            </table>
-                        </div>
-                    </div>
-                </div>
+def payroll_period(month, year):
+    """Numeric yyyymm period key for a month name and year, e.g. 202401"""
+    if month not in MONTH_NAMES:
+        raise ValueError(
+            f"Unknown month: {month!r}; expected a full month name such as "
+            f"'January'")
+    return int(year) * 100 + MONTH_NAMES.index(month) + 1
 
-                <!-- Payroll Management -->
-                <div class="col-lg-6">
-                    <div class="section-card">
-                        <h3 class="section-title"><i class="fas fa-calculator"></i> Payroll Management</h3>
-                        
-                        <!-- Process Payroll -->
-                        <div class="mb-4">
-                            <button class="btn btn-primary-custom btn-custom" data-bs-toggle="modal" data-bs-target="#processPayrollModal">
-                                <i class="fas fa-calculator"></i> Process Payroll
-                            </button>
-                            <button class="btn btn-success-custom btn-custom" data-bs-toggle="modal" data-bs-target="#bulkPayrollModal">
-                                <i class="fas fa-upload"></i> Bulk Process
-                            </button>
-                            <a href="{{ url_for('download_payroll_template') }}" class="btn btn-warning-custom btn-custom">
-                                <i class="fas fa-download"></i> Template
-                            </a>
-                        </div>
-
-                        <!-- Recent Payroll -->
-                        <div class="table-responsive">
-                            <table class="table table-hover">
-                                <thead>
-                                    <tr>
-                                        <th>Employee</th>
-                                        <th>Month</th>
-                                        <th>Net Salary</th>
-                                        <th>Actions</th>
-                                    </tr>
-                                </thead>
-                                <tbody>
-                                    {% for payroll in recent_payroll %}
-                                    <tr>
-                                        <td>{{ payroll.name }}</td>
-                                        <td>{{ payroll.month }} {{ payroll.year }}</td>
-                                        <td>₹{{ "%.0f"|format(payroll.net_salary) }}</td>
-                                        <td>
-                                            <button class="btn btn-sm btn-primary-custom" onclick="viewPayslip('{{ payroll.emp_id }}', '{{ payroll.month }}', {{ payroll.year }})">
-                                                <i class="fas fa-eye"></i> View
-                                            </button>
-                                            <a href="/download_payslip/{{ payroll.emp_id }}/{{ payroll.month }}/{{ payroll.year }}" class="btn btn-sm btn-success-custom">
-                                                <i class="fas fa-download"></i> PDF
-                                            </a>
-                                        </td>
-                                    </tr>
-                                    {% endfor %}
-                                </tbody>
-                            </table>
-                        </div>
-                    </div>
-                </div>
-            </div>
 
-            <!-- Enhanced Payroll Management -->
-            <div class="row">
-                <div class="col-lg-12">
-                    <div class="section-card">
-                        <h3 class="section-title"><i class="fas fa-file-invoice-dollar"></i> All Payroll Records</h3>
-                        
-                        <!-- Filter Options -->
-                        <div class="row mb-4">
-                            <div class="col-md-3">
-                                <select class="form-select" id="monthFilter">
-                                    <option value="">All Months</option>
-                                    <option value="January">January</option>
-                                    <option value="February">February</option>
-                                    <option value="March">March</option>
-                                    <option value="April">April</option>
-                                    <option value="May">May</option>
-                                    <option value="June">June</option>
-                                    <option value="July">July</option>
-                                    <option value="August">August</option>
-                                    <option value="September">September</option>
-                                    <option value="October">October</option>
-                                    <option value="November">November</option>
-                                    <option value="December">December</option>
-                                </select>
-                            </div>
-                            <div class="col-md-3">
-                                <select class="form-select" id="yearFilter">
-                                    <option value="">All Years</option>
-                                    <option value="2024">2024</option>
-                                    <option value="2023">2023</option>
-                                    <option value="2025">2025</option>
-                                </select>
-                            </div>
-                            <div class="col-md-6 text-end">
-                                <button class="btn btn-primary-custom btn-custom" onclick="loadAllPayrolls()">
-                                    <i class="fas fa-sync-alt"></i> Refresh
-                                </button>
-                                <button class="btn btn-success-custom btn-custom" data-bs-toggle="modal" data-bs-target="#emailModal">
-                                    <i class="fas fa-paper-plane"></i> Send Payslips
-                                </button>
-                                <button class="btn btn-warning-custom btn-custom" onclick="downloadReport()">
-                                    <i class="fas fa-file-excel"></i> Download Report
-                                </button>
-                            </div>
-                        </div>
-
-                        <!-- All Payroll Records Table -->
-                        <div class="table-responsive" id="allPayrollTable">
-                            <table class="table table-hover">
-                                <thead>
-                                    <tr>
-                                        <th>Employee ID</th>
-                                        <th>Name</th>
-                                        <th>Month/Year</th>
-                                        <th>Days Worked</th>
-                                        <th>Gross Salary</th>
-                                        <th>Net Salary</th>
-                                        <th>Actions</th>
-                                    </tr>
-                                </thead>
-                                <tbody id="payrollTableBody">
-                                    {% for payroll in all_payroll %}
-                                    <tr>
-                                        <td>{{ payroll.emp_id }}</td>
-                                        <td>{{ payroll.name }}</td>
-                                        <td>{{ payroll.month }} {{ payroll.year }}</td>
-                                        <td>{{ payroll.days_worked }} days</td>
-                                        <td>₹{{ "%.2f"|format(payroll.gross_salary) }}</td>
-                                        <td>₹{{ "%.2f"|format(payroll.net_salary) }}</td>
-                                        <td>
-                                            <button class="btn btn-sm btn-primary-custom" onclick="viewPayslip('{{ payroll.emp_id }}', '{{ payroll.month }}', {{ payroll.year }})">
-                                                <i class="fas fa-eye"></i> View
-                                            </button>
-                                            <a href="/download_payslip/{{ payroll.emp_id }}/{{ payroll.month }}/{{ payroll.year }}" class="btn btn-sm btn-success-custom">
-                                                <i class="fas fa-download"></i> PDF
-                                            </a>
-                                        </td>
-                                    </tr>
-                                    {% endfor %}
-                                </tbody>
-                            </table>
-                        </div>
-                    </div>
-                </div>
-            </div>
+def parse_period(value):
+    """Parse a period given as yyyymm or yyyy-mm into its numeric key"""
+    period = int(value.replace('-', ''))
+    if not 1 <= period % 100 <= 12:
+        raise ValueError(f'Invalid period: {value}')
+    return period
 
-            <!-- Additional Actions -->
-            <div class="row">
-                <div class="col-lg-6">
-                    <div class="section-card">
-                        <h3 class="section-title"><i class="fas fa-arrow-up"></i> Salary Hike Management</h3>
-                        <button class="btn btn-primary-custom btn-custom" data-bs-toggle="modal" data-bs-target="#hikeModal">
-                            <i class="fas fa-arrow-up"></i> Apply Hike
-                        </button>
-                        <p class="mt-2 text-muted">Select employee and apply salary hike during payroll processing</p>
-                    </div>
-                </div>
-                <div class="col-lg-6">
-                    <div class="section-card">
-                        <h3 class="section-title"><i class="fas fa-users"></i> Employee Overview</h3>
-                        <button class="btn btn-warning-custom btn-custom" data-bs-toggle="modal" data-bs-target="#allEmployeesModal">
-                            <i class="fas fa-list"></i> View All Employees
-                        </button>
-                        <p class="mt-2 text-muted">View complete employee list with details and salary information</p>
-                    </div>
-                </div>
-            </div>
 
-            <!-- Charts -->
-            <div class="row">
-                <div class="col-12">
-                    <div class="section-card">
-                        <h3 class="section-title"><i class="fas fa-chart-bar"></i> Monthly Payroll Analytics</h3>
-                        <div class="chart-container">
-                            <canvas id="payrollChart"></canvas>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </div>
-    </div>
-
-    <!-- Modals -->
-    
-    <!-- Add Employee Modal -->
-    <div class="modal fade" id="addEmployeeModal" tabindex="-1">
-        <div class="modal-dialog modal-lg">
-            <div class="modal-content">
-                <div class="modal-header">
-                    <h5 class="modal-title"><i class="fas fa-user-plus"></i> Add Employee</h5>
-                    <button type="button" class="btn-close btn-close-white" data-bs-dismiss="modal"></button>
-                </div>
-                <form method="POST" action="{{ url_for('add_employee') }}">
-                    <div class="modal-body">
-                        <div class="row">
-                            <div class="col-md-6">
-                                <div class="mb-3">
-                                    <label for="emp_id" class="form-label">Employee ID</label>
-                                    <input type="text" class="form-control" name="emp_id" required>
-                                </div>
-                            </div>
-                            <div class="col-md-6">
-                                <div class="mb-3">
-                                    <label for="name" class="form-label">Full Name</label>
-                                    <input type="text" class="form-control" name="name" required>
-                                </div>
-                            </div>
-                        </div>
-                        <div class="row">
-                            <div class="col-md-6">
-                                <div class="mb-3">
-                                    <label for="email" class="form-label">Email Address</label>
-                                    <input type="email" class="form-control" name="email" required>
-                                </div>
-                            </div>
-                            <div class="col-md-6">
-                                <div class="mb-3">
-                                    <label for="designation" class="form-label">Designation</label>
-                                    <input type="text" class="form-control" name="designation">
-                                </div>
-                            </div>
-                        </div>
-                        <div class="row">
-                            <div class="col-md-6">
-                                <div class="mb-3">
-                                    <label for="department" class="form-label">Department</label>
-                                    <input type="text" class="form-control" name="department">
-                                </div>
-                            </div>
-                            <div class="col-md-6">
-                                <div class="mb-3">
-                                    <label for="joining_date" class="form-label">Joining Date</label>
-                                    <input type="date" class="form-control" name="joining_date">
-                                </div>
-                            </div>
-                        </div>
-                        <div class="row">
-                            <div class="col-md-6">
-                                <div class="mb-3">
-                                    <label for="ctc_monthly" class="form-label">Monthly CTC (₹)</label>
-                                    <input type="number" class="form-control" name="ctc_monthly" step="0.01" required>
-                                </div>
-                            </div>
-                            <div class="col-md-6">
-                                <div class="mb-3">
-                                    <label class="form-label">PF Opted</label>
-                                    <div class="form-check mt-2">
-                                        <input class="form-check-input" type="checkbox" name="pf_opted" checked>
-                                        <label class="form-check-label">Employee opts for Provident Fund</label>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>
-                    </div>
-                    <div class="modal-footer">
-                        <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">Cancel</button>
-                        <button type="submit" class="btn btn-primary-custom">Add Employee</button>
-                    </div>
-                </form>
-            </div>
-        </div>
-    </div>
-
-    <!-- Bulk Add Employee Modal -->
-    <div class="modal fade" id="bulkEmployeeModal" tabindex="-1">
-        <div class="modal-dialog">
-            <div class="modal-content">
-                <div class="modal-header">
-                    <h5 class="modal-title"><i class="fas fa-upload"></i> Bulk Add Employees</h5>
-                    <button type="button" class="btn-close btn-close-white" data-bs-dismiss="modal"></button>
-                </div>
-                <form method="POST" action="{{ url_for('bulk_add_employees') }}" enctype="multipart/form-data">
-                    <div class="modal-body">
-                        <div class="file-upload-area">
-                            <i class="fas fa-cloud-upload-alt fa-3x mb-3 text-muted"></i>
-                            <h5>Upload Employee Excel File</h5>
-                            <p class="text-muted">Select your filled employee template file</p>
-                            <input type="file" class="form-control" name="file" accept=".xlsx,.xls" required>
-                        </div>
-                        <div class="mt-3">
-                            <small class="text-muted">
-                                <strong>Template Format:</strong> emp_id, name, email, designation, department, joining_date, ctc_monthly, pf_opted
-                            </small>
-                        </div>
-                    </div>
-                    <div class="modal-footer">
-                        <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">Cancel</button>
-                        <button type="submit" class="btn btn-success-custom">Upload & Process</button>
-                    </div>
-                </form>
-            </div>
-        </div>
-    </div>
-
-    <!-- Process Payroll Modal -->
-    <div class="modal fade" id="processPayrollModal" tabindex="-1">
-        <div class="modal-dialog modal-lg">
-            <div class="modal-content">
-                <div class="modal-header">
-                    <h5 class="modal-title"><i class="fas fa-calculator"></i> Process Individual Payroll</h5>
-                    <button type="button" class="btn-close btn-close-white" data-bs-dismiss="modal"></button>
-                </div>
-                <form method="POST" action="{{ url_for('process_individual_payroll') }}">
-                    <div class="modal-body">
-                        <div class="row">
-                            <div class="col-md-6">
-                                <div class="mb-3">
-                                    <label for="emp_id_select" class="form-label">Select Employee</label>
-                                    <select class="form-select" name="emp_id" required>
-                                        <option value="">Choose Employee...</option>
-                                        {% for emp in employees %}
-                                        <option value="{{ emp.emp_id }}">{{ emp.emp_id }} - {{ emp.name }}</option>
-                                        {% endfor %}
-                                    </select>
-                                </div>
-                            </div>
-                            <div class="col-md-6">
-                                <div class="mb-3">
-                                    <label for="days_worked" class="form-label">Days Worked</label>
-                                    <input type="number" class="form-control" name="days_worked" value="30" min="1" max="31" required>
-                                </div>
-                            </div>
-                        </div>
-                        <div class="row">
-                            <div class="col-md-6">
-                                <div class="mb-3">
-                                    <label for="month" class="form-label">Month</label>
-                                    <select class="form-select" name="month" required>
-                                        <option value="January">January</option>
-                                        <option value="February">February</option>
-                                        <option value="March">March</option>
-                                        <option value="April">April</option>
-                                        <option value="May">May</option>
-                                        <option value="June">June</option>
-                                        <option value="July">July</option>
-                                        <option value="August">August</option>
-                                        <option value="September">September</option>
-                                        <option value="October">October</option>
-                                        <option value="November">November</option>
-                                        <option value="December">December</option>
-                                    </select>
-                                </div>
-                            </div>
-                            <div class="col-md-6">
-                                <div class="mb-3">
-                                    <label for="year" class="form-label">Year</label>
-                                    <input type="number" class="form-control" name="year" value="2024" min="2020" max="2030" required>
-                                </div>
-                            </div>
-                        </div>
-                        <div class="row">
-                            <div class="col-md-6">
-                                <div class="mb-3">
-                                    <label class="form-label">PF Opted</label>
-                                    <div class="form-check mt-2">
-                                        <input class="form-check-input" type="checkbox" name="pf_opted" checked>
-                                        <label class="form-check-label">Employee opts for PF deduction</label>
-                                    </div>
-                                </div>
-                            </div>
-                            <div class="col-md-6">
-                                <div class="mb-3">
-                                    <label for="hike_amount" class="form-label">Hike Amount (₹)</label>
-                                    <input type="number" class="form-control" name="hike_amount" value="0" step="0.01">
-                                    <small class="text-muted">Optional: Add hike to monthly CTC</small>
-                                </div>
-                            </div>
-                        </div>
-                    </div>
-                    <div class="modal-footer">
-                        <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">Cancel</button>
-                        <button type="submit" class="btn btn-primary-custom">Process Payroll</button>
-                    </div>
-                </form>
-            </div>
-        </div>
-    </div>
-
-    <!-- Bulk Process Payroll Modal -->
-    <div class="modal fade" id="bulkPayrollModal" tabindex="-1">
-        <div class="modal-dialog">
-            <div class="modal-content">
-                <div class="modal-header">
-                    <h5 class="modal-title"><i class="fas fa-upload"></i> Bulk Process Payroll</h5>
-                    <button type="button" class="btn-close btn-close-white" data-bs-dismiss="modal"></button>
-                </div>
-                <form method="POST" action="{{ url_for('bulk_process_payroll') }}" enctype="multipart/form-data">
-                    <div class="modal-body">
-                        <div class="row">
-                            <div class="col-md-6">
-                                <div class="mb-3">
-                                    <label for="month" class="form-label">Month</label>
-                                    <select class="form-select" name="month" required>
-                                        <option value="January">January</option>
-                                        <option value="February">February</option>
-                                        <option value="March">March</option>
-                                        <option value="April">April</option>
-                                        <option value="May">May</option>
-                                        <option value="June">June</option>
-                                        <option value="July">July</option>
-                                        <option value="August">August</option>
-                                        <option value="September">September</option>
-                                        <option value="October">October</option>
-                                        <option value="November">November</option>
-                                        <option value="December">December</option>
-                                    </select>
-                                </div>
-                            </div>
-                            <div class="col-md-6">
-                                <div class="mb-3">
-                                    <label for="year" class="form-label">Year</label>
-                                    <input type="number" class="form-control" name="year" value="2024" min="2020" max="2030" required>
-                                </div>
-                            </div>
-                        </div>
-                        <div class="file-upload-area">
-                            <i class="fas fa-cloud-upload-alt fa-3x mb-3 text-muted"></i>
-                            <h5>Upload Payroll Excel File</h5>
-                            <p class="text-muted">Select your filled payroll template file</p>
-                            <input type="file" class="form-control" name="file" accept=".xlsx,.xls" required>
-                        </div>
-                        <div class="mt-3">
-                            <small class="text-muted">
-                                <strong>Template Format:</strong> emp_id, name, days_worked, pf_opted
-                            </small>
-                        </div>
-                    </div>
-                    <div class="modal-footer">
-                        <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">Cancel</button>
-                        <button type="submit" class="btn btn-success-custom">Upload & Process</button>
-                    </div>
-                </form>
-            </div>
-        </div>
-    </div>
-
-    <!-- Salary Hike Modal -->
-    <div class="modal fade" id="hikeModal" tabindex="-1">
-        <div class="modal-dialog">
-            <div class="modal-content">
-                <div class="modal-header">
-                    <h5 class="modal-title"><i class="fas fa-arrow-up"></i> Apply Salary Hike</h5>
-                    <button type="button" class="btn-close btn-close-white" data-bs-dismiss="modal"></button>
-                </div>
-                <form method="POST" action="{{ url_for('apply_hike') }}">
-                    <div class="modal-body">
-                        <div class="mb-3">
-                            <label for="hike_emp_id" class="form-label">Select Employee</label>
-                            <select class="form-select" name="emp_id" required>
-                                <option value="">Choose Employee...</option>
-                                {% for emp in employees %}
-                                <option value="{{ emp.emp_id }}">{{ emp.emp_id }} - {{ emp.name }} (Current: ₹{{ "%.0f"|format(emp.ctc_monthly) }})</option>
-                                {% endfor %}
-                            </select>
-                        </div>
-                        <div class="mb-3">
-                            <label for="hike_amount" class="form-label">Hike Amount (₹)</label>
-                            <input type="number" class="form-control" name="hike_amount" step="0.01" required>
-                            <small class="text-muted">This amount will be added to the current monthly CTC</small>
-                        </div>
-                        <div class="mb-3">
-                            <label for="hike_reason" class="form-label">Reason for Hike</label>
-                            <textarea class="form-control" name="hike_reason" rows="3" placeholder="Performance increment, promotion, etc."></textarea>
-                        </div>
-                    </div>
-                    <div class="modal-footer">
-                        <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">Cancel</button>
-                        <button type="submit" class="btn btn-primary-custom">Apply Hike</button>
-                    </div>
-                </form>
-            </div>
-        </div>
-    </div>
-
-    <!-- Email Modal -->
-    <div class="modal fade" id="emailModal" tabindex="-1">
-        <div class="modal-dialog">
-            <div class="modal-content">
-                <div class="modal-header">
-                    <h5 class="modal-title"><i class="fas fa-envelope"></i> Send Payslips</h5>
-                    <button type="button" class="btn-close btn-close-white" data-bs-dismiss="modal"></button>
-                </div>
-                <form method="POST" action="{{ url_for('send_payslips') }}">
-                    <div class="modal-body">
-                        <div class="row">
-                            <div class="col-md-6">
-                                <div class="mb-3">
-                                    <label for="email_month" class="form-label">Month</label>
-                                    <select class="form-select" name="month" required>
-                                        <option value="January">January</option>
-                                        <option value="February">February</option>
-                                        <option value="March">March</option>
-                                        <option value="April">April</option>
-                                        <option value="May">May</option>
-                                        <option value="June">June</option>
-                                        <option value="July">July</option>
-                                        <option value="August">August</option>
-                                        <option value="September">September</option>
-                                        <option value="October">October</option>
-                                        <option value="November">November</option>
-                                        <option value="December">December</option>
-                                    </select>
-                                </div>
-                            </div>
-                            <div class="col-md-6">
-                                <div class="mb-3">
-                                    <label for="email_year" class="form-label">Year</label>
-                                    <input type="number" class="form-control" name="year" value="2024" min="2020" max="2030" required>
-                                </div>
-                            </div>
-                        </div>
-                        <div class="alert alert-info">
-                            <i class="fas fa-info-circle"></i> 
-                            This will send payslips to all employees who have processed payroll for the selected month/year.
-                        </div>
-                    </div>
-                    <div class="modal-footer">
-                        <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">Cancel</button>
-                        <button type="submit" class="btn btn-success-custom">Send Payslips</button>
-                    </div>
-                </form>
-            </div>
-        </div>
-    </div>
-
-    <!-- Payslip View Modal -->
-    <div class="modal fade" id="payslipModal" tabindex="-1">
-        <div class="modal-dialog modal-xl">
-            <div class="modal-content">
-                <div class="modal-header">
-                    <h5 class="modal-title"><i class="fas fa-file-invoice-dollar"></i> Payslip Details</h5>
-                    <button type="button" class="btn-close btn-close-white" data-bs-dismiss="modal"></button>
-                </div>
-                <div class="modal-body" id="payslipContent">
-                    <!-- Payslip content will be loaded here -->
-                </div>
-                <div class="modal-footer">
-                    <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">Close</button>
-                    <button type="button" class="btn btn-success-custom" id="downloadPayslipBtn">
-                        <i class="fas fa-download"></i> Download PDF
-                    </button>
-                </div>
-            </div>
-        </div>
-    </div>
-
-    <!-- All Employees Modal -->
-    <div class="modal fade" id="allEmployeesModal" tabindex="-1">
-        <div class="modal-dialog modal-xl">
-            <div class="modal-content">
-                <div class="modal-header">
-                    <h5 class="modal-title"><i class="fas fa-users"></i> All Employees</h5>
-                    <button type="button" class="btn-close btn-close-white" data-bs-dismiss="modal"></button>
-                </div>
-                <div class="modal-body">
-                    <div class="table-responsive">
-                        <table class="table table-hover">
-                            <thead>
-                                <tr>
-                                    <th>Employee ID</th>
-                                    <th>Name</th>
-                                    <th>Email</th>
-                                    <th>Designation</th>
-                                    <th>Department</th>
-                                    <th>Monthly CTC</th>
-                                    <th>PF Opted</th>
-                                    <th>Joining Date</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-                                {% for emp in employees %}
-                                <tr>
-                                    <td>{{ emp.emp_id }}</td>
-                                    <td>{{ emp.name }}</td>
-                                    <td>{{ emp.email }}</td>
-                                    <td>{{ emp.designation or 'N/A' }}</td>
-                                    <td>{{ emp.department or 'N/A' }}</td>
-                                    <td>₹{{ "%.2f"|format(emp.ctc_monthly) }}</td>
-                                    <td>
-                                        {% if emp.pf_opted %}
-                                            <span class="badge bg-success">Yes</span>
-                                        {% else %}
-                                            <span class="badge bg-danger">No</span>
-                                        {% endif %}
-                                    </td>
-                                    <td>{{ emp.joining_date or 'N/A' }}</td>
-                                </tr>
-                                {% endfor %}
-                            </tbody>
-                        </table>
-                    </div>
-                </div>
-                <div class="modal-footer">
-                    <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">Close</button>
-                </div>
-            </div>
-        </div>
-    </div>
-
-    <!-- Employee Cost Breakdown Modal -->
-    <div class="modal fade" id="employeeCostModal" tabindex="-1">
-        <div class="modal-dialog modal-lg">
-            <div class="modal-content">
-                <div class="modal-header">
-                    <h5 class="modal-title"><i class="fas fa-calculator"></i> Employee Cost Breakdown</h5>
-                    <button type="button" class="btn-close btn-close-white" data-bs-dismiss="modal"></button>
-                </div>
-                <div class="modal-body" id="employeeCostContent">
-                    <!-- Cost breakdown content will be loaded here -->
-                </div>
-                <div class="modal-footer">
-                    <button type="button" class="btn btn-secondary" data-bs-dismiss="modal">Close</button>
-                </div>
-            </div>
-        </div>
-    </div>
-
-    <!-- Bootstrap JS -->
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js"></script>
-    
-    <script>
-        // Chart.js for payroll analytics
-        document.addEventListener('DOMContentLoaded', function() {
-            const ctx = document.getElementById('payrollChart').getContext('2d');
-            
-            // Sample data - this would come from the backend in a real application
-            const monthlyData = {{ monthly_stats|tojson }};
-            const labels = [];
-            const data = [];
-            
-            monthlyData.forEach(function(item) {
-                labels.push(item.month + ' ' + item.year);
-                data.push(item.total_payout || 0);
-            });
-            
-            new Chart(ctx, {
-                type: 'bar',
-                data: {
-                    labels: labels.reverse(),
-                    datasets: [{
-                        label: 'Monthly Payout (₹)',
-                        data: data.reverse(),
-                        backgroundColor: 'rgba(52, 152, 219, 0.8)',
-                        borderColor: 'rgba(52, 152, 219, 1)',
-                        borderWidth: 1
-                    }]
-                },
-                options: {
-                    responsive: true,
-                    maintainAspectRatio: false,
-                    scales: {
-                        y: {
-                            beginAtZero: true,
-                            ticks: {
-                                callback: function(value) {
-                                    return '₹' + value.toLocaleString();
-                                }
-                            }
-                        }
-                    },
-                    plugins: {
-                        legend: {
-                            display: true,
-                            position: 'top'
-                        },
-                        tooltip: {
-                            callbacks: {
-                                label: function(context) {
-                                    return 'Total Payout: ₹' + context.parsed.y.toLocaleString();
-                                }
-                            }
-                        }
-                    }
-                }
-            });
-        });
-
-        // Auto-dismiss alerts after 5 seconds
-        setTimeout(function() {
-            const alerts = document.querySelectorAll('.alert');
-            alerts.forEach(function(alert) {
-                const bsAlert = new bootstrap.Alert(alert);
-                bsAlert.close();
-            });
-        }, 5000);
-
-        // View payslip function
-        function viewPayslip(empId, month, year) {
-            fetch(`/api/payslip/${empId}/${month}/${year}`)
-                .then(response => response.json())
-                .then(data => {
-                    if (data.success) {
-                        document.getElementById('payslipContent').innerHTML = data.html;
-                        document.getElementById('downloadPayslipBtn').onclick = function() {
-                            window.open(`/download_payslip/${empId}/${month}/${year}`, '_blank');
-                        };
-                        new bootstrap.Modal(document.getElementById('payslipModal')).show();
-                    } else {
-                        alert('Error loading payslip: ' + data.message);
-                    }
-                })
-                .catch(error => {
-                    console.error('Error:', error);
-                    alert('Error loading payslip');
-                });
-        }
-
-        // Load all payrolls with filtering
-        function loadAllPayrolls() {
-            const month = document.getElementById('monthFilter').value;
-            const year = document.getElementById('yearFilter').value;
-            
-            let url = '/api/payrolls';
-            const params = new URLSearchParams();
-            if (month) params.append('month', month);
-            if (year) params.append('year', year);
-            if (params.toString()) url += '?' + params.toString();
-            
-            fetch(url)
-                .then(response => response.json())
-                .then(data => {
-                    if (data.success) {
-                        updatePayrollTable(data.payrolls);
-                    } else {
-                        alert('Error loading payrolls: ' + data.message);
-                    }
-                })
-                .catch(error => {
-                    console.error('Error:', error);
-                    alert('Error loading payrolls');
-                });
-        }
-
-        function updatePayrollTable(payrolls) {
-            const tbody = document.getElementById('payrollTableBody');
-            tbody.innerHTML = '';
-            
-            payrolls.forEach(payroll => {
-                const row = `
-                    <tr>
-                        <td>${payroll.emp_id}</td>
-                        <td>${payroll.name}</td>
-                        <td>${payroll.month} ${payroll.year}</td>
-                        <td>${payroll.days_worked} days</td>
-                        <td>₹${parseFloat(payroll.gross_salary).toFixed(2)}</td>
-                        <td>₹${parseFloat(payroll.net_salary).toFixed(2)}</td>
-                        <td>
-                            <button class="btn btn-sm btn-primary-custom" onclick="viewPayslip('${payroll.emp_id}', '${payroll.month}', ${payroll.year})">
-                                <i class="fas fa-eye"></i> View
-                            </button>
-                            <a href="/download_payslip/${payroll.emp_id}/${payroll.month}/${payroll.year}" class="btn btn-sm btn-success-custom">
-                                <i class="fas fa-download"></i> PDF
-                            </a>
-                        </td>
-                    </tr>
-                `;
-                tbody.innerHTML += row;
-            });
-        }
-
-        // Add event listeners for filters
-        document.getElementById('monthFilter').addEventListener('change', loadAllPayrolls);
-        document.getElementById('yearFilter').addEventListener('change', loadAllPayrolls);
-
-        // View employee cost breakdown
-        function viewEmployeeCostBreakdown(empId, name, ctcMonthly) {
-            const breakdown = calculateSalaryBreakdown(ctcMonthly);
-            
-            const costHtml = `
-                <div class="cost-breakdown-container">
-                    <div class="employee-header" style="text-align: center; margin-bottom: 30px; padding: 20px; background: linear-gradient(135deg, #2c3e50 0%, #3498db 100%); color: white; border-radius: 8px;">
-                        <h3 style="margin: 0;">${name} (${empId})</h3>
-                        <p style="margin: 5px 0 0 0; opacity: 0.9;">Monthly CTC: ₹${ctcMonthly.toFixed(2)}</p>
-                    </div>
-                    
-                    <div class="cost-table" style="background: white; border: 1px solid #ddd; border-radius: 8px; overflow: hidden;">
-                        <div class="section-header" style="background: #2c3e50; color: white; padding: 15px; text-align: center;">
-                            <h4 style="margin: 0;">SALARY STRUCTURE</h4>
-                        </div>
-                        
-                        <table style="width: 100%; border-collapse: collapse;">
-                            <thead>
-                                <tr style="background: #3498db; color: white;">
-                                    <th style="padding: 12px; text-align: left; border: 1px solid #ddd;">Component</th>
-                                    <th style="padding: 12px; text-align: right; border: 1px solid #ddd;">Amount (₹)</th>
-                                    <th style="padding: 12px; text-align: right; border: 1px solid #ddd;">Percentage</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-                                <tr><td style="padding: 10px; border: 1px solid #ddd;">Basic Salary</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">₹${breakdown.basic_salary.toFixed(2)}</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">40%</td></tr>
-                                <tr><td style="padding: 10px; border: 1px solid #ddd;">HRA</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">₹${breakdown.hra.toFixed(2)}</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">20%</td></tr>
-                                <tr><td style="padding: 10px; border: 1px solid #ddd;">Travel Allowance</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">₹${breakdown.travel_allowance.toFixed(2)}</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">10%</td></tr>
-                                <tr><td style="padding: 10px; border: 1px solid #ddd;">Medical Allowance</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">₹${breakdown.medical_allowance.toFixed(2)}</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">5%</td></tr>
-                                <tr><td style="padding: 10px; border: 1px solid #ddd;">LTA</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">₹${breakdown.lta.toFixed(2)}</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">8%</td></tr>
-                                <tr><td style="padding: 10px; border: 1px solid #ddd;">Special Allowance</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">₹${breakdown.special_allowance.toFixed(2)}</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">17%</td></tr>
-                                <tr style="background: #e8f5e8; font-weight: bold;"><td style="padding: 12px; border: 1px solid #ddd;">GROSS SALARY</td><td style="padding: 12px; text-align: right; border: 1px solid #ddd;">₹${breakdown.gross_salary.toFixed(2)}</td><td style="padding: 12px; text-align: right; border: 1px solid #ddd;">100%</td></tr>
-                                <tr><td style="padding: 10px; border: 1px solid #ddd; color: #e74c3c; font-weight: bold;">Potential Deductions:</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;"></td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;"></td></tr>
-                                <tr><td style="padding: 10px; border: 1px solid #ddd; padding-left: 30px;">PF Contribution (12%)</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd; color: #e74c3c;">₹${breakdown.pf_deduction.toFixed(2)}</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">-12%</td></tr>
-                                <tr style="background: #2c3e50; color: white; font-weight: bold; font-size: 1.1em;"><td style="padding: 15px; border: 1px solid #ddd;">POTENTIAL NET SALARY</td><td style="padding: 15px; text-align: right; border: 1px solid #ddd;">₹${breakdown.net_salary.toFixed(2)}</td><td style="padding: 15px; text-align: right; border: 1px solid #ddd;">88%</td></tr>
-                            </tbody>
-                        </table>
-                    </div>
-                    
-                    <div style="margin-top: 20px; padding: 15px; background: #fff3cd; border: 1px solid #ffeaa7; border-radius: 8px;">
-                        <i class="fas fa-info-circle"></i> <strong>Note:</strong> This is the salary structure breakdown. Actual deductions may vary based on PF opt-in, attendance, and other factors.
-                    </div>
-                </div>
-            `;
-            
-            document.getElementById('employeeCostContent').innerHTML = costHtml;
-            new bootstrap.Modal(document.getElementById('employeeCostModal')).show();
-        }
-
-        // Download report function
-        function downloadReport() {
-            const month = document.getElementById('monthFilter').value;
-            const year = document.getElementById('yearFilter').value;
-            
-            if (!month || !year) {
-                alert('Please select both month and year to download report');
-                return;
-            }
-            
-            window.open(`/download_report/${month}/${year}`, '_blank');
-        }
-
-        // Helper function to calculate salary breakdown
-        function calculateSalaryBreakdown(ctcMonthly) {
-            const basic_salary = ctcMonthly * 0.40;
-            const hra = ctcMonthly * 0.20;
-            const travel_allowance = ctcMonthly * 0.10;
-            const medical_allowance = ctcMonthly * 0.05;
-            const lta = ctcMonthly * 0.08;
-            const special_allowance = ctcMonthly * 0.17;
-            const gross_salary = basic_salary + hra + travel_allowance + medical_allowance + lta + special_allowance;
-            const pf_deduction = basic_salary * 0.12;
-            const net_salary = gross_salary - pf_deduction;
-            
-            return {
-                basic_salary,
-                hra,
-                travel_allowance,
-                medical_allowance,
-                lta,
-                special_allowance,
-                gross_salary,
-                pf_deduction,
-                net_salary
-            };
-        }
-    </script>
-</body>
-</html>
-"""
+# Applied to every connection; journal_mode=WAL is persisted in the database
+# file so readers no longer block behind bulk writers
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # negative values are KiB, so 64MB
+    'busy_timeout': 5000,
+}
+
+_db_local = threading.local()
+
+
+def open_db_connection():
+    """Open a new connection to the payroll database with tuned pragmas"""
+    conn = sqlite3.connect(app.config['DATABASE'])
+    conn.row_factory = sqlite3.Row
+    for pragma, value in SQLITE_PRAGMAS.items():
+        conn.execute(f'PRAGMA {pragma} = {value}')
+    return conn
 
 
 # Database initialization
 def init_db():
-    conn = sqlite3.connect('payroll.db')
+    conn = open_db_connection()
     cursor = conn.cursor()
 
     # Create employees table
@@ -1291,20 +234,521 @@ def init_db():
         )
     ''')
 
+    # Apply schema migrations newer than the stored user_version
+    version = cursor.execute('PRAGMA user_version').fetchone()[0]
+    for number, migration in enumerate(SCHEMA_MIGRATIONS[version:],
+                                       start=version + 1):
+        migration(cursor)
+        cursor.execute(f'PRAGMA user_version = {number}')
+
     conn.commit()
     conn.close()
 
 
-# Initialize database on startup
-init_db()
+def discard_payroll_rows(cursor, where, reason):
+    """Delete the payroll rows matching where, logging each one first.
+
+    Used by migrations that have to drop conflicting history, so the
+    discarded figures can still be recovered from the log.
+    """
+    rows = cursor.execute(f'''
+        SELECT id, emp_id, month, year, gross_salary, net_salary
+        FROM payroll WHERE {where}
+    ''').fetchall()
+    if not rows:
+        return
+    logging.warning(
+        f'Discarding {len(rows)} payroll rows ({reason}): ' + ', '.join(
+            f'id {row[0]} ({row[1]}, {row[2]!r} {row[3]}, gross {row[4]}, '
+            f'net {row[5]})' for row in rows))
+    cursor.execute(f'DELETE FROM payroll WHERE {where}')
+
+
+def migrate_payroll_indexes(cursor):
+    """Make (emp_id, month, year) unique so payroll writes can upsert"""
+    # Keep only the latest row for any period that was processed twice
+    discard_payroll_rows(
+        cursor, '''
+        id NOT IN (
+            SELECT MAX(id) FROM payroll GROUP BY emp_id, month, year
+        )''', 'older duplicates of a later row for the same month')
+
+    # Leading emp_id column serves the payroll side of the JOIN with
+    # employees; employees.emp_id already has the UNIQUE autoindex
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_payroll_emp_period
+        ON payroll (emp_id, month, year)
+    ''')
+
+    # Month/year filters used by send_payslips, reports and the API
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_payroll_period
+        ON payroll (year, month)
+    ''')
+
+    # "Recent payroll" listings order by processed_at
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_payroll_processed_at
+        ON payroll (processed_at)
+    ''')
+
+
+def migrate_employee_search_indexes(cursor):
+    """Indexes behind the /api/employees prefix search and keyset paging"""
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_employees_name
+        ON employees (name COLLATE NOCASE, emp_id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_employees_emp_id_nocase
+        ON employees (emp_id COLLATE NOCASE)
+    ''')
+
+
+def migrate_payroll_monthly_summary(cursor):
+    """Per-period payroll totals, kept current by triggers on payroll.
+
+    The triggers run inside the transaction of every payroll insert, update
+    or delete, so the dashboard and report summaries can read one row per
+    period instead of aggregating the whole payroll history.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS payroll_monthly_summary (
+            month TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            payroll_count INTEGER NOT NULL DEFAULT 0,
+            total_gross REAL NOT NULL DEFAULT 0,
+            total_net REAL NOT NULL DEFAULT 0,
+            total_pf REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (year, month)
+        )
+    ''')
+
+    # Backfill from existing payroll history
+    cursor.execute('''
+        INSERT OR REPLACE INTO payroll_monthly_summary
+            (month, year, payroll_count, total_gross, total_net, total_pf)
+        SELECT month, year, COUNT(*), COALESCE(SUM(gross_salary), 0),
+               COALESCE(SUM(net_salary), 0), COALESCE(SUM(pf_deduction), 0)
+        FROM payroll
+        GROUP BY year, month
+    ''')
+
+    add_new_row = '''
+        INSERT INTO payroll_monthly_summary
+            (month, year, payroll_count, total_gross, total_net, total_pf)
+        VALUES (NEW.month, NEW.year, 1, COALESCE(NEW.gross_salary, 0),
+                COALESCE(NEW.net_salary, 0), COALESCE(NEW.pf_deduction, 0))
+        ON CONFLICT (year, month) DO UPDATE SET
+            payroll_count = payroll_count + 1,
+            total_gross = total_gross + excluded.total_gross,
+            total_net = total_net + excluded.total_net,
+            total_pf = total_pf + excluded.total_pf;
+    '''
+    remove_old_row = '''
+        UPDATE payroll_monthly_summary SET
+            payroll_count = payroll_count - 1,
+            total_gross = total_gross - COALESCE(OLD.gross_salary, 0),
+            total_net = total_net - COALESCE(OLD.net_salary, 0),
+            total_pf = total_pf - COALESCE(OLD.pf_deduction, 0)
+        WHERE year = OLD.year AND month = OLD.month;
+        DELETE FROM payroll_monthly_summary
+        WHERE year = OLD.year AND month = OLD.month AND payroll_count <= 0;
+    '''
+
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_payroll_summary_insert
+        AFTER INSERT ON payroll
+        BEGIN {add_new_row} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_payroll_summary_update
+        AFTER UPDATE ON payroll
+        BEGIN {remove_old_row} {add_new_row} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_payroll_summary_delete
+        AFTER DELETE ON payroll
+        BEGIN {remove_old_row} END
+    ''')
+
+
+def report_unparsed_payroll_months(cursor):
+    """Log payroll rows whose month could not be turned into a period.
+
+    Listings, summaries and exports all key on period, so these rows are
+    invisible until their month is corrected.
+    """
+    rows = cursor.execute('''
+        SELECT id, emp_id, month, year FROM payroll WHERE period IS NULL
+    ''').fetchall()
+    if not rows:
+        return
+    logging.warning(
+        f'{len(rows)} payroll rows have a month that is not a month name and '
+        'no period, so they are left out of listings, summaries and exports. '
+        'Set their month to a month name and period to yyyymm to include '
+        'them: ' + ', '.join(
+            f'id {row[0]} ({row[1]}, {row[2]!r} {row[3]})' for row in rows))
+
+
+def migrate_payroll_period_key(cursor):
+    """Add a numeric, sortable yyyymm period to payroll and its summary"""
+    cursor.execute('ALTER TABLE payroll ADD COLUMN period INTEGER')
+    cursor.execute(
+        'ALTER TABLE payroll_monthly_summary ADD COLUMN period INTEGER')
+
+    # Backfill from the free-text month; "jan", "JANUARY" etc. all map to 1
+    cursor.execute('''
+        UPDATE payroll SET period = year * 100 + (
+            CASE lower(substr(trim(month), 1, 3))
+            WHEN 'jan' THEN 1
+            WHEN 'feb' THEN 2
+            WHEN 'mar' THEN 3
+            WHEN 'apr' THEN 4
+            WHEN 'may' THEN 5
+            WHEN 'jun' THEN 6
+            WHEN 'jul' THEN 7
+            WHEN 'aug' THEN 8
+            WHEN 'sep' THEN 9
+            WHEN 'oct' THEN 10
+            WHEN 'nov' THEN 11
+            WHEN 'dec' THEN 12
+            END)
+    ''')
+
+    # Spellings of the same period would collide once normalized; keep the
+    # latest row, as migrate_payroll_indexes did for exact duplicates
+    discard_payroll_rows(
+        cursor, '''
+        period IS NOT NULL AND id NOT IN (
+            SELECT MAX(id) FROM payroll
+            WHERE period IS NOT NULL
+            GROUP BY emp_id, period
+        )''', 'older spellings of a later row for the same period')
+
+    # Normalize month spellings to the names the forms submit
+    month_names = ' '.join(
+        f"WHEN {number} THEN '{name}'"
+        for number, name in enumerate(MONTH_NAMES, start=1))
+    cursor.execute(f'''
+        UPDATE payroll SET month = CASE period % 100 {month_names} END
+        WHERE period IS NOT NULL
+    ''')
+
+    # Serves period equality, range filters and ordering by period
+    cursor.execute('DROP INDEX IF EXISTS idx_payroll_period')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_payroll_period_emp
+        ON payroll (period, emp_id)
+    ''')
+
+    # Recreate the summary triggers so they carry the period along
+    for trigger in ('insert', 'update', 'delete'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS trg_payroll_summary_{trigger}')
+
+    add_new_row = '''
+        INSERT INTO payroll_monthly_summary
+            (month, year, period, payroll_count, total_gross, total_net, total_pf)
+        VALUES (NEW.month, NEW.year, NEW.period, 1, COALESCE(NEW.gross_salary, 0),
+                COALESCE(NEW.net_salary, 0), COALESCE(NEW.pf_deduction, 0))
+        ON CONFLICT (year, month) DO UPDATE SET
+            period = excluded.period,
+            payroll_count = payroll_count + 1,
+            total_gross = total_gross + excluded.total_gross,
+            total_net = total_net + excluded.total_net,
+            total_pf = total_pf + excluded.total_pf;
+    '''
+    remove_old_row = '''
+        UPDATE payroll_monthly_summary SET
+            payroll_count = payroll_count - 1,
+            total_gross = total_gross - COALESCE(OLD.gross_salary, 0),
+            total_net = total_net - COALESCE(OLD.net_salary, 0),
+            total_pf = total_pf - COALESCE(OLD.pf_deduction, 0)
+        WHERE year = OLD.year AND month = OLD.month;
+        DELETE FROM payroll_monthly_summary
+        WHERE year = OLD.year AND month = OLD.month AND payroll_count <= 0;
+    '''
+
+    cursor.execute(f'''
+        CREATE TRIGGER trg_payroll_summary_insert
+        AFTER INSERT ON payroll
+        BEGIN {add_new_row} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_payroll_summary_update
+        AFTER UPDATE ON payroll
+        BEGIN {remove_old_row} {add_new_row} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_payroll_summary_delete
+        AFTER DELETE ON payroll
+        BEGIN {remove_old_row} END
+    ''')
+
+    # Rebuild the summary from the normalized rows
+    cursor.execute('DELETE FROM payroll_monthly_summary')
+    cursor.execute('''
+        INSERT INTO payroll_monthly_summary
+            (month, year, period, payroll_count, total_gross, total_net, total_pf)
+        SELECT month, year, MAX(period), COUNT(*), COALESCE(SUM(gross_salary), 0),
+               COALESCE(SUM(net_salary), 0), COALESCE(SUM(pf_deduction), 0)
+        FROM payroll
+        GROUP BY year, month
+    ''')
+
+
+def migrate_jobs_table(cursor):
+    """Queue table for background jobs run outside the request cycle"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            total INTEGER,
+            done INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            heartbeat_at TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    ''')
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id)')
+
+
+def migrate_payroll_revision(cursor):
+    """Single-row counter bumped by triggers on every payroll change.
+
+    It versions the payroll listing for conditional GETs, so validating a
+    cached response costs one primary-key lookup.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS payroll_revision (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            revision INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute(
+        'INSERT OR IGNORE INTO payroll_revision (id, revision) VALUES (1, 0)')
+
+    for trigger, event in (('insert', 'INSERT'), ('update', 'UPDATE'),
+                           ('delete', 'DELETE')):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_payroll_revision_{trigger}
+            AFTER {event} ON payroll
+            BEGIN
+                UPDATE payroll_revision SET revision = revision + 1 WHERE id = 1;
+            END
+        ''')
+
+
+def migrate_payslip_outbox(cursor):
+    """Per-employee delivery record for payslip emails"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS payslip_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            emp_id TEXT NOT NULL,
+            period INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (emp_id, period)
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_payslip_outbox_due
+        ON payslip_outbox(period, status, next_attempt_at)
+    ''')
+
+
+def migrate_employees_revision(cursor):
+    """Single-row counter bumped by triggers on every employee change.
+
+    Payroll listings include employee columns, so their ETags carry this
+    alongside payroll_revision.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS employees_revision (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            revision INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute(
+        'INSERT OR IGNORE INTO employees_revision (id, revision) VALUES (1, 0)')
+
+    for trigger, event in (('insert', 'INSERT'), ('update', 'UPDATE'),
+                           ('delete', 'DELETE')):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_employees_revision_{trigger}
+            AFTER {event} ON employees
+            BEGIN
+                UPDATE employees_revision SET revision = revision + 1 WHERE id = 1;
+            END
+        ''')
+
+
+def migrate_payroll_period_required(cursor):
+    """Refuse payroll rows without a period instead of silently hiding them"""
+    # Rows the period backfill could not parse are reported once here
+    report_unparsed_payroll_months(cursor)
+
+    for trigger, event in (('insert', 'INSERT'), ('update', 'UPDATE')):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_payroll_period_required_{trigger}
+            BEFORE {event} ON payroll
+            WHEN NEW.period IS NULL
+            BEGIN
+                SELECT RAISE(ABORT,
+                    'payroll.period is required: month must be a month name');
+            END
+        ''')
+
+
+def migrate_payslip_outbox_retry_base(cursor):
+    """Attempts count at which an outbox row was last queued for sending"""
+    cursor.execute('ALTER TABLE payslip_outbox '
+                   'ADD COLUMN retry_base INTEGER NOT NULL DEFAULT 0')
+
+
+def migrate_payslip_outbox_claims(cursor):
+    """Job holding an outbox row while its payslip is being sent"""
+    cursor.execute('ALTER TABLE payslip_outbox ADD COLUMN claimed_by INTEGER')
+
+
+def migrate_payroll_api_indexes(cursor):
+    """Indexes behind /api/payrolls keyset paging and its filters"""
+    # Pages walk (period, emp_id) backwards; carrying net_salary lets the
+    # salary range be checked in the index without visiting table rows
+    cursor.execute('DROP INDEX IF EXISTS idx_payroll_period_emp')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_payroll_period_emp_net
+        ON payroll (period, emp_id, net_salary)
+    ''')
+
+    # One employee's payroll in period order
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_payroll_emp_period_key
+        ON payroll (emp_id, period)
+    ''')
+
+    # Department filter answered from the index on the employees side of
+    # the JOIN
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_employees_emp_department
+        ON employees (emp_id, department)
+    ''')
+
+
+# Ordered list of schema migrations; the position is the schema version
+SCHEMA_MIGRATIONS = [
+    migrate_payroll_indexes,
+    migrate_employee_search_indexes,
+    migrate_payroll_monthly_summary,
+    migrate_payroll_period_key,
+    migrate_jobs_table,
+    migrate_payroll_revision,
+    migrate_payslip_outbox,
+    migrate_payroll_api_indexes,
+    migrate_payslip_outbox_retry_base,
+    migrate_employees_revision,
+    migrate_payroll_period_required,
+    migrate_payslip_outbox_claims,
+]
+
+# Initialize database on startup. Payslip render workers are spawned and
+# import this module again; only the main process touches the schema.
+# parent_process() is not yet set while a spawned child imports, but its
+# name already is
+if multiprocessing.current_process().name == 'MainProcess':
+    init_db()
 
 
 def get_db_connection():
-    conn = sqlite3.connect('payroll.db')
-    conn.row_factory = sqlite3.Row
+    """Return the payroll database connection for the current thread.
+
+    The connection is opened on first use and reused by every later request
+    on the same worker thread, so handlers must not close it.
+    """
+    conn = getattr(_db_local, 'conn', None)
+    if conn is None:
+        conn = _db_local.conn = open_db_connection()
     return conn
 
 
+def tuple_cursor(conn):
+    """Cursor on conn that returns plain tuples instead of sqlite3.Row"""
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    return cursor
+
+
+def cursor_columns(cursor):
+    """Column names of the cursor's current result"""
+    return [column[0] for column in cursor.description]
+
+
+def fetch_dicts(conn, query, params=()):
+    """Rows of query as dicts, built from tuples in one pass"""
+    cursor = tuple_cursor(conn).execute(query, params)
+    columns = cursor_columns(cursor)
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+@app.teardown_appcontext
+def release_db_connection(exception=None):
+    """Roll back whatever a handler left uncommitted, e.g. on an early return"""
+    conn = getattr(_db_local, 'conn', None)
+    if conn is not None and conn.in_transaction:
+        conn.rollback()
+
+
+PAYROLL_UPSERT_SQL = '''
+    INSERT INTO payroll (emp_id, month, year, days_worked, basic_salary, hra,
+                         travel_allowance, medical_allowance, lta, special_allowance,
+                         employer_pf, employee_pf, pf_deduction, gross_salary,
+                         net_salary, hike_amount, period)
+    VALUES (:emp_id, :month, :year, :days_worked, :basic, :hra,
+            :travel_allowance, :medical_allowance, :lta, :special_allowance,
+            :employer_pf, :employee_pf, :pf_deduction, :gross_salary,
+            :net_salary, COALESCE(:hike_amount, 0), :period)
+    ON CONFLICT (emp_id, month, year) DO UPDATE SET
+        days_worked = excluded.days_worked, basic_salary = excluded.basic_salary,
+        hra = excluded.hra, travel_allowance = excluded.travel_allowance,
+        medical_allowance = excluded.medical_allowance, lta = excluded.lta,
+        special_allowance = excluded.special_allowance,
+        employer_pf = excluded.employer_pf, employee_pf = excluded.employee_pf,
+        pf_deduction = excluded.pf_deduction, gross_salary = excluded.gross_salary,
+        net_salary = excluded.net_salary,
+        hike_amount = COALESCE(:hike_amount, payroll.hike_amount),
+        processed_at = CURRENT_TIMESTAMP
+'''
+
+
+def upsert_payroll(conn, emp_id, month, year, days_worked, salary_components,
+                   hike_amount=None):
+    """Insert or update the payroll row for one employee and period.
+
+    A hike_amount of None keeps the stored hike on update (and inserts 0),
+    which is what bulk processing has always done.
+    """
+    params = dict(salary_components,
+                  emp_id=emp_id,
+                  month=month,
+                  year=year,
+                  days_worked=days_worked,
+                  hike_amount=hike_amount,
+                  period=payroll_period(month, year))
+    conn.execute(PAYROLL_UPSERT_SQL, params)
+
+
 def calculate_salary_components(ctc_monthly, pf_opted=True):
     """Calculate salary components based on CTC structure from the provided image"""
     # Proportional calculation based on the 1 lakh example
@@ -1360,60 +804,415 @@ def calculate_salary_components(ctc_monthly, pf_opted=True):
     }
 
 
-def generate_payslip_pdf(employee_data, payroll_data):
-    """Generate PDF payslip for an employee"""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
+def calculate_salary_frame(ctc_monthly, pf_opted, days_worked):
+    """Vectorized calculate_salary_components with days-worked proration.
 
-    # Custom styles
-    title_style = ParagraphStyle('CustomTitle',
-                                 parent=styles['Heading1'],
-                                 fontSize=18,
-                                 spaceAfter=30,
-                                 alignment=TA_CENTER,
-                                 textColor=colors.darkblue)
+    Takes aligned Series and returns a DataFrame with one column per salary
+    component, rounded the same way as the per-employee calculation.
+    """
+    ratio = ctc_monthly / 100000.0
 
-    heading_style = ParagraphStyle('CustomHeading',
-                                   parent=styles['Heading2'],
-                                   fontSize=14,
-                                   spaceAfter=12,
-                                   textColor=colors.darkblue)
+    basic = 50000 * ratio
+    hra = 20000 * ratio
+    travel_allowance = 1600 * ratio
+    medical_allowance = 1250 * ratio
+    lta = 2083 * ratio
+    employer_pf = 1800 * ratio
 
-    content = []
+    other_components = basic + hra + travel_allowance + medical_allowance + lta + employer_pf
+    special_allowance = (ctc_monthly - other_components +
+                         employer_pf).clip(lower=0)
 
-    # Title
-    content.append(Paragraph("PAYSLIP", title_style))
-    content.append(Spacer(1, 20))
+    # PF calculation based on salary and opt-in status
+    pf_deduction = pd.Series(np.select(
+        [~pf_opted | (ctc_monthly < 15000), ctc_monthly <= 19999],
+        [0.0, 150.0], 200.0),
+                             index=ctc_monthly.index)
 
-    # Employee Information
-    emp_info = [['Employee ID:', employee_data['emp_id']],
-                ['Name:', employee_data['name']],
-                ['Designation:', employee_data['designation'] or 'N/A'],
-                ['Department:', employee_data['department'] or 'N/A'],
-                [
-                    'Pay Period:',
-                    f"{payroll_data['month']} {payroll_data['year']}"
-                ], ['Days Worked:',
-                    str(payroll_data['days_worked'])]]
-
-    emp_table = Table(emp_info, colWidths=[2 * inch, 3 * inch])
-    emp_table.setStyle(
+    gross_salary = basic + hra + travel_allowance + medical_allowance + lta + special_allowance
+
+    components = pd.DataFrame({
+        'basic': basic,
+        'hra': hra,
+        'travel_allowance': travel_allowance,
+        'medical_allowance': medical_allowance,
+        'lta': lta,
+        'special_allowance': special_allowance,
+        'employer_pf': employer_pf,
+        'employee_pf': pf_deduction,
+        'pf_deduction': pf_deduction,
+        'gross_salary': gross_salary,
+        'net_salary': gross_salary - pf_deduction
+    }).round(2)
+
+    # Adjust for days worked; employer PF remains constant
+    prorated = components.columns != 'employer_pf'
+    components.loc[:, prorated] = components.loc[:, prorated].mul(
+        days_worked / 30.0, axis=0).round(2)
+
+    return components
+
+
+def process_payroll_frame(conn, df, month, year):
+    """Calculate and upsert payroll for every row of an uploaded DataFrame.
+
+    Returns (success_count, error_count). Rows for unknown employees or with
+    an unreadable days_worked value are counted as errors.
+    """
+    emp_ids = df['emp_id'].astype(str)
+    if 'days_worked' in df:
+        days_worked = pd.to_numeric(df['days_worked'], errors='coerce')
+    else:
+        days_worked = pd.Series(30, index=df.index)
+    if 'pf_opted' in df:
+        pf_opted = df['pf_opted'].astype(str).str.lower().isin(
+            ['yes', '1', 'true'])
+    else:
+        pf_opted = pd.Series(True, index=df.index)
+
+    # Load every referenced employee in one query
+    employees = pd.read_sql_query(
+        '''
+        SELECT emp_id, ctc_monthly FROM employees
+        WHERE emp_id IN (SELECT value FROM json_each(?))
+    ''',
+        conn,
+        params=(json.dumps(emp_ids.unique().tolist()), ),
+        index_col='emp_id')
+    ctc_monthly = emp_ids.map(employees['ctc_monthly'])
+
+    valid = ctc_monthly.notna() & days_worked.notna()
+    error_count = int((~valid).sum())
+    if error_count:
+        logging.error(
+            f"Skipped {error_count} payroll rows with unknown employees or invalid days_worked: "
+            f"{', '.join(emp_ids[~valid].head(20))}")
+
+    days_worked = days_worked[valid].astype(int)
+    payroll = calculate_salary_frame(ctc_monthly[valid], pf_opted[valid],
+                                     days_worked)
+    payroll['emp_id'] = emp_ids[valid]
+    payroll['month'] = month
+    payroll['year'] = year
+    payroll['period'] = payroll_period(month, year)
+    payroll['days_worked'] = days_worked
+    payroll['hike_amount'] = None
+
+    with conn:
+        conn.executemany(PAYROLL_UPSERT_SQL, payroll.to_dict('records'))
+
+    return len(payroll), error_count
+
+
+def save_upload(file):
+    """Save an uploaded file under UPLOAD_FOLDER for a background job.
+
+    The stored name is random so concurrent uploads never collide; only the
+    extension of the original name is kept.
+    """
+    extension = os.path.splitext(secure_filename(file.filename))[1].lower()
+    path = os.path.join(app.config['UPLOAD_FOLDER'],
+                        f'upload_{uuid.uuid4().hex}{extension}')
+    file.save(path)
+    return path
+
+
+def count_upload_rows(path):
+    """Number of data rows in a saved upload, without parsing it into memory"""
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.csv':
+        with open(path, newline='', encoding='utf-8', errors='replace') as f:
+            return max(sum(1 for _ in csv.reader(f)) - 1, 0)
+
+    if extension == '.xls':
+        return None
+
+    # The sheet dimension is read from the header of the worksheet XML
+    workbook = load_workbook(path, read_only=True)
+    try:
+        max_row = workbook.active.max_row
+        return max(max_row - 1, 0) if max_row else None
+    finally:
+        workbook.close()
+
+
+def iter_upload_frames(path, chunk_rows=None):
+    """Yield a saved spreadsheet upload as DataFrames of at most chunk_rows rows.
+
+    CSV is parsed incrementally and XLSX is read with openpyxl in read-only
+    mode, so peak memory stays bounded whatever the file size. Each chunk's
+    index is the data row number (0 for the row under the header), counted
+    before blank rows are dropped, so it still points at the sheet row.
+    """
+    chunk_rows = chunk_rows or app.config['UPLOAD_CHUNK_ROWS']
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.csv':
+        # Read as text so IDs such as 007 keep their leading zeros. Blank
+        # lines are kept while parsing and dropped afterwards, so the index
+        # keeps counting them
+        for chunk in pd.read_csv(path,
+                                 chunksize=chunk_rows,
+                                 dtype=str,
+                                 skip_blank_lines=False):
+            chunk = chunk.dropna(how='all')
+            if not chunk.empty:
+                yield chunk
+        return
+
+    if extension == '.xls':
+        # Legacy .xls has no streaming reader, so it is parsed whole
+        yield pd.read_excel(path)
+        return
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [
+            str(cell).strip() if cell is not None else ''
+            for cell in next(rows, ())
+        ]
+        width = len(header)
+        numbered = enumerate(rows)
+        while True:
+            batch = list(itertools.islice(numbered, chunk_rows))
+            if not batch:
+                break
+            # Read-only rows can be ragged; pad or trim them to the header.
+            # Blank rows are skipped but keep their place in the numbering
+            batch = [(number, row[:width] + (None, ) * (width - len(row)))
+                     for number, row in batch
+                     if any(cell is not None for cell in row)]
+            if not batch:
+                continue
+            numbers, values = zip(*batch)
+            yield pd.DataFrame(list(values),
+                               columns=header,
+                               index=pd.Index(numbers))
+    finally:
+        workbook.close()
+
+
+EMPLOYEE_IMPORT_CHUNK_SIZE = 5000
+
+EMPLOYEE_REJECT_COLUMNS = [
+    'row', 'emp_id', 'name', 'email', 'designation', 'department',
+    'joining_date', 'ctc_monthly', 'pf_opted', 'reason'
+]
+
+
+def validate_employee_frame(df):
+    """Type-convert an uploaded employee sheet in one pass.
+
+    Returns (clean, rejects): clean holds the rows ready for staging and
+    rejects the raw values of every invalid row with a reason. The row column
+    is the spreadsheet row number (the header is row 1).
+    """
+
+    def text(column):
+        if column not in df:
+            return pd.Series('', index=df.index)
+        return df[column].fillna('').astype(str).str.strip()
+
+    clean = pd.DataFrame({
+        'row': df.index + 2,
+        'emp_id': text('emp_id'),
+        'name': text('name'),
+        'email': text('email'),
+        'designation': text('designation'),
+        'department': text('department')
+    })
+
+    if 'joining_date' in df:
+        joining_date = pd.to_datetime(df['joining_date'],
+                                      format='mixed',
+                                      errors='coerce')
+        bad_date = joining_date.isna() & (text('joining_date') != '')
+        clean['joining_date'] = joining_date.dt.strftime('%Y-%m-%d').fillna(
+            date.today().isoformat())
+    else:
+        bad_date = pd.Series(False, index=df.index)
+        clean['joining_date'] = date.today().isoformat()
+
+    if 'ctc_monthly' in df:
+        clean['ctc_monthly'] = pd.to_numeric(df['ctc_monthly'],
+                                             errors='coerce')
+    else:
+        clean['ctc_monthly'] = np.nan
+    clean['ctc_annual'] = clean['ctc_monthly'] * 12
+    clean['pf_opted'] = text('pf_opted').str.lower().isin(
+        ['yes', '1', 'true']).astype(int)
+
+    reason = pd.Series(np.select([
+        clean['emp_id'] == '', clean['name'] == '',
+        ~clean['email'].str.match(r'^[^@\s]+@[^@\s]+\.[^@\s]+$'),
+        ~(clean['ctc_monthly'] > 0), bad_date
+    ], [
+        'missing emp_id', 'missing name', 'invalid email',
+        'invalid ctc_monthly', 'invalid joining_date'
+    ], ''),
+                       index=df.index)
+    invalid = reason != ''
+
+    rejects = pd.DataFrame({
+        column: text(column)
+        for column in EMPLOYEE_REJECT_COLUMNS[1:-1]
+    })[invalid]
+    rejects.insert(0, 'row', clean['row'][invalid])
+    rejects['reason'] = reason[invalid]
+
+    return clean[~invalid], rejects
+
+
+def import_employees(conn, frames, rejects_path):
+    """Bulk-load employee upload chunks through a staging table.
+
+    Every chunk is validated in vectorized form and staged with executemany;
+    the clean rows are then merged into employees in a single statement. Rows
+    that fail validation or repeat an emp_id that already exists (in the
+    database or earlier in the file) are written to rejects_path as CSV.
+
+    Returns (added_count, rejected_count).
+    """
+    rejected_count = 0
+
+    def write_rejects(rejects):
+        nonlocal rejected_count
+        if rejects.empty:
+            return
+        rejects.to_csv(rejects_path,
+                       mode='a',
+                       header=rejected_count == 0,
+                       index=False,
+                       columns=EMPLOYEE_REJECT_COLUMNS)
+        rejected_count += len(rejects)
+
+    with conn:
+        conn.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS employee_staging (
+                row INTEGER PRIMARY KEY,
+                emp_id TEXT NOT NULL,
+                name TEXT NOT NULL,
+                email TEXT NOT NULL,
+                designation TEXT,
+                department TEXT,
+                joining_date DATE,
+                ctc_monthly REAL NOT NULL,
+                ctc_annual REAL NOT NULL,
+                pf_opted INTEGER
+            )
+        ''')
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS temp.idx_employee_staging_emp
+            ON employee_staging (emp_id, row)
+        ''')
+        conn.execute('DELETE FROM employee_staging')
+
+        for df in frames:
+            clean, rejects = validate_employee_frame(df)
+            write_rejects(rejects)
+            records = clean.to_dict('records')
+            for start in range(0, len(records), EMPLOYEE_IMPORT_CHUNK_SIZE):
+                conn.executemany(
+                    '''
+                    INSERT INTO employee_staging (row, emp_id, name, email, designation,
+                                                  department, joining_date, ctc_monthly,
+                                                  ctc_annual, pf_opted)
+                    VALUES (:row, :emp_id, :name, :email, :designation, :department,
+                            :joining_date, :ctc_monthly, :ctc_annual, :pf_opted)
+                ''', records[start:start + EMPLOYEE_IMPORT_CHUNK_SIZE])
+
+        # Rows whose emp_id is taken, or was already used earlier in the file
+        duplicates = pd.read_sql_query(
+            '''
+            SELECT s.row, s.emp_id, s.name, s.email, s.designation, s.department,
+                   s.joining_date, s.ctc_monthly,
+                   CASE s.pf_opted WHEN 1 THEN 'Yes' ELSE 'No' END AS pf_opted,
+                   CASE WHEN e.emp_id IS NOT NULL THEN 'emp_id already exists'
+                        ELSE 'duplicate emp_id in file' END AS reason
+            FROM employee_staging s
+            LEFT JOIN employees e ON e.emp_id = s.emp_id
+            WHERE e.emp_id IS NOT NULL
+               OR s.row > (SELECT MIN(d.row) FROM employee_staging d
+                           WHERE d.emp_id = s.emp_id)
+            ORDER BY s.row
+        ''', conn)
+        write_rejects(duplicates)
+
+        added_count = conn.execute('''
+            INSERT INTO employees (emp_id, name, email, designation, department,
+                                   joining_date, ctc_monthly, ctc_annual, pf_opted)
+            SELECT emp_id, name, email, designation, department,
+                   joining_date, ctc_monthly, ctc_annual, pf_opted
+            FROM employee_staging s
+            WHERE s.row = (SELECT MIN(d.row) FROM employee_staging d
+                           WHERE d.emp_id = s.emp_id)
+              AND NOT EXISTS (SELECT 1 FROM employees e WHERE e.emp_id = s.emp_id)
+            ORDER BY s.row
+        ''').rowcount
+
+        conn.execute('DELETE FROM employee_staging')
+
+    return added_count, rejected_count
+
+
+@lru_cache(maxsize=None)
+def payslip_styles():
+    """Paragraph and table styles of the payslip, built once per process"""
+    styles = getSampleStyleSheet()
+
+    return {
+        'title':
+        ParagraphStyle('CustomTitle',
+                       parent=styles['Heading1'],
+                       fontSize=18,
+                       spaceAfter=30,
+                       alignment=TA_CENTER,
+                       textColor=colors.darkblue),
+        'heading':
+        ParagraphStyle('CustomHeading',
+                       parent=styles['Heading2'],
+                       fontSize=14,
+                       spaceAfter=12,
+                       textColor=colors.darkblue),
+        'normal':
+        styles['Normal'],
+        'employee_table':
         TableStyle([('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
                     ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
                     ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
                     ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
                     ('FONTSIZE', (0, 0), (-1, -1), 10),
                     ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black)]))
+                    ('GRID', (0, 0), (-1, -1), 1, colors.black)]),
+        'salary_table':
+        TableStyle([('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                    ('BACKGROUND', (0, 7), (-1, 7), colors.lightgrey),
+                    ('BACKGROUND', (0, -1), (-1, -1), colors.darkblue),
+                    ('TEXTCOLOR', (0, -1), (-1, -1), colors.whitesmoke),
+                    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+                    ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+                    ('FONTSIZE', (0, 0), (-1, -1), 10),
+                    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+                    ('GRID', (0, 0), (-1, -1), 1, colors.black)]),
+    }
 
-    content.append(emp_table)
-    content.append(Spacer(1, 20))
 
-    # Salary Breakdown
-    content.append(Paragraph("SALARY BREAKDOWN", heading_style))
+def payslip_employee_rows(employee_data, payroll_data):
+    return [['Employee ID:', employee_data['emp_id']],
+            ['Name:', employee_data['name']],
+            ['Designation:', employee_data['designation'] or 'N/A'],
+            ['Department:', employee_data['department'] or 'N/A'],
+            ['Pay Period:', f"{payroll_data['month']} {payroll_data['year']}"],
+            ['Days Worked:', str(payroll_data['days_worked'])]]
+
 
-    salary_data = [
+def payslip_salary_rows(payroll_data):
+    return [
         ['Component', 'Amount (₹)'],
         ['Basic Salary', f"{payroll_data['basic_salary']:,.2f}"],
         ['HRA', f"{payroll_data['hra']:,.2f}"],
@@ -1427,43 +1226,915 @@ def generate_payslip_pdf(employee_data, payroll_data):
         ['NET SALARY', f"{payroll_data['net_salary']:,.2f}"]
     ]
 
-    salary_table = Table(salary_data, colWidths=[3 * inch, 2 * inch])
-    salary_table.setStyle(
-        TableStyle([('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('BACKGROUND', (0, 7), (-1, 7), colors.lightgrey),
-                    ('BACKGROUND', (0, -1), (-1, -1), colors.darkblue),
-                    ('TEXTCOLOR', (0, -1), (-1, -1), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                    ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black)]))
+
+def generate_payslip_pdf_platypus(employee_data, payroll_data):
+    """Generate a payslip through the platypus flow.
+
+    This is the reference layout that generate_payslip_pdf reproduces with
+    direct canvas drawing; it is kept for comparison and benchmarking.
+    """
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    styles = payslip_styles()
+
+    content = []
+
+    # Title
+    content.append(Paragraph("PAYSLIP", styles['title']))
+    content.append(Spacer(1, 20))
+
+    # Employee Information
+    emp_table = Table(payslip_employee_rows(employee_data, payroll_data),
+                      colWidths=[2 * inch, 3 * inch])
+    emp_table.setStyle(styles['employee_table'])
+
+    content.append(emp_table)
+    content.append(Spacer(1, 20))
+
+    # Salary Breakdown
+    content.append(Paragraph("SALARY BREAKDOWN", styles['heading']))
+
+    salary_table = Table(payslip_salary_rows(payroll_data),
+                         colWidths=[3 * inch, 2 * inch])
+    salary_table.setStyle(styles['salary_table'])
 
     content.append(salary_table)
     content.append(Spacer(1, 30))
 
     # Footer
     footer_text = f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-    content.append(Paragraph(footer_text, styles['Normal']))
+    content.append(Paragraph(footer_text, styles['normal']))
 
     doc.build(content)
     buffer.seek(0)
     return buffer
 
 
-def send_payslip_email(employee_email, employee_name, payslip_pdf, month,
-                       year):
-    """Send payslip via email"""
+# Fixed payslip geometry, worked out once from the platypus flow above: the
+# A4 frame has one-inch margins and 6pt padding, both tables are 5 inches wide
+# and centred, and table rows are 21pt (10pt text, 3pt top and 6pt bottom
+# padding). Paragraph baselines sit one font size below the top of the line.
+PAYSLIP_FRAME_TOP = A4[1] - inch - 6
+PAYSLIP_FRAME_CENTER = A4[0] / 2
+PAYSLIP_TABLE_LEFT = (A4[0] - 5 * inch) / 2
+PAYSLIP_ROW_HEIGHT = 21
+PAYSLIP_TITLE_BASELINE = PAYSLIP_FRAME_TOP - 18
+# Title leading and space after, then a 20pt spacer
+PAYSLIP_EMPLOYEE_TABLE_TOP = PAYSLIP_FRAME_TOP - 22 - 30 - 20
+# Six rows, 20pt spacer and the heading's 12pt space before
+PAYSLIP_HEADING_BASELINE = (PAYSLIP_EMPLOYEE_TABLE_TOP - 6 * PAYSLIP_ROW_HEIGHT -
+                            20 - 12 - 14)
+# Rest of the heading's leading and its 12pt space after
+PAYSLIP_SALARY_TABLE_TOP = PAYSLIP_HEADING_BASELINE - 4 - 12
+# Fourteen rows and a 30pt spacer
+PAYSLIP_FOOTER_BASELINE = (PAYSLIP_SALARY_TABLE_TOP -
+                           14 * PAYSLIP_ROW_HEIGHT - 30 - 10)
+
+
+def draw_payslip_table(pdf, top, rows, split, backgrounds, bold_rows,
+                       right_align):
+    """Draw a two-column payslip table whose top-left corner is at top.
+
+    split is the width of the first column, backgrounds maps a row index
+    (or 'label' for the whole first column) to its fill colour, bold_rows are
+    drawn in white bold on their background, and right_align right-aligns the
+    second column.
+    """
+    width = 5 * inch
+    left = PAYSLIP_TABLE_LEFT
+    bottom = top - len(rows) * PAYSLIP_ROW_HEIGHT
+
+    for row, fill in backgrounds.items():
+        pdf.setFillColor(fill)
+        if row == 'label':
+            pdf.rect(left, bottom, split, top - bottom, stroke=0, fill=1)
+        else:
+            pdf.rect(left, top - (row % len(rows) + 1) * PAYSLIP_ROW_HEIGHT,
+                     width, PAYSLIP_ROW_HEIGHT, stroke=0, fill=1)
+
+    # All cells go into one text object rather than one per drawString
+    text = pdf.beginText()
+    bold_rows = {row % len(rows) for row in bold_rows}
+    bold = None
+    for index, (label, value) in enumerate(rows):
+        if bold is not (index in bold_rows):
+            bold = index in bold_rows
+            font = 'Helvetica-Bold' if bold else 'Helvetica'
+            text.setFillColor(colors.whitesmoke if bold else colors.black)
+            text.setFont(font, 10)
+
+        baseline = top - (index + 1) * PAYSLIP_ROW_HEIGHT + 8
+        if label:
+            text.setTextOrigin(left + 6, baseline)
+            text.textOut(label)
+        if value:
+            x = left + split + 6
+            if right_align:
+                x = left + width - 6 - pdf.stringWidth(value, font, 10)
+            text.setTextOrigin(x, baseline)
+            text.textOut(value)
+    pdf.drawText(text)
+
+    pdf.setStrokeColor(colors.black)
+    pdf.setLineWidth(1)
+    pdf.setLineCap(1)
+    pdf.setLineJoin(1)
+    pdf.grid([left, left + split, left + width], [
+        top - index * PAYSLIP_ROW_HEIGHT for index in range(len(rows) + 1)
+    ])
+
+
+def draw_payslip_page(pdf, employee_data, payroll_data, generated_at=None):
+    """Draw one payslip as the current page of pdf and start a new page.
+
+    Draws straight onto the canvas at the precomputed positions above, which
+    is several times faster than laying out the equivalent platypus story.
+    """
+    generated_at = generated_at or datetime.now()
+
+    # Title
+    pdf.setFillColor(colors.darkblue)
+    pdf.setFont('Helvetica-Bold', 18)
+    pdf.drawCentredString(PAYSLIP_FRAME_CENTER, PAYSLIP_TITLE_BASELINE,
+                          'PAYSLIP')
+
+    # Employee Information
+    draw_payslip_table(pdf,
+                       PAYSLIP_EMPLOYEE_TABLE_TOP,
+                       payslip_employee_rows(employee_data, payroll_data),
+                       split=2 * inch,
+                       backgrounds={'label': colors.lightgrey},
+                       bold_rows=(),
+                       right_align=False)
+
+    # Salary Breakdown
+    pdf.setFillColor(colors.darkblue)
+    pdf.setFont('Helvetica-Bold', 14)
+    pdf.drawString(inch + 6, PAYSLIP_HEADING_BASELINE, 'SALARY BREAKDOWN')
+
+    draw_payslip_table(pdf,
+                       PAYSLIP_SALARY_TABLE_TOP,
+                       payslip_salary_rows(payroll_data),
+                       split=3 * inch,
+                       backgrounds={
+                           0: colors.darkblue,
+                           7: colors.lightgrey,
+                           -1: colors.darkblue
+                       },
+                       bold_rows=(0, -1),
+                       right_align=True)
+
+    # Footer
+    pdf.setFillColor(colors.black)
+    pdf.setFont('Helvetica', 10)
+    pdf.drawString(
+        inch + 6, PAYSLIP_FOOTER_BASELINE,
+        f"Generated on: {generated_at.strftime('%Y-%m-%d %H:%M:%S')}")
+
+    pdf.showPage()
+
+
+def generate_payslip_pdf(employee_data, payroll_data):
+    """Generate PDF payslip for an employee"""
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    draw_payslip_page(pdf, employee_data, payroll_data)
+    pdf.save()
+    buffer.seek(0)
+    return buffer
+
+
+def write_payslip_register(output, records, title):
+    """Write the payslips for records into one multi-page PDF on output.
+
+    Every payslip is a page of a single canvas, so the fonts and page
+    resources are written once for the whole register rather than once per
+    payslip. records may be any iterable, such as a database cursor, and is
+    consumed one row at a time. Returns the number of pages.
+    """
+    pdf = canvas.Canvas(output, pagesize=A4)
+    pdf.setTitle(title)
+    generated_at = datetime.now()
+    pages = 0
+    for record in records:
+        draw_payslip_page(pdf, record, record, generated_at)
+        pages += 1
+    pdf.save()
+    return pages
+
+
+# Fields a payslip is rendered from; processed_at is bumped by every upsert,
+# so re-processing a payroll row always yields a fresh cache key
+PAYSLIP_CACHE_FIELDS = ('emp_id', 'name', 'designation', 'department',
+                        'month', 'year', 'days_worked', 'basic_salary', 'hra',
+                        'travel_allowance', 'medical_allowance', 'lta',
+                        'special_allowance', 'gross_salary', 'pf_deduction',
+                        'net_salary', 'processed_at')
+# Bump when the payslip layout changes so stale PDFs are not served
+PAYSLIP_CACHE_VERSION = 1
+
+_payslip_cache_lock = threading.Lock()
+_payslip_cache_size = None
+
+
+def payslip_cache_path(employee_data, payroll_data):
+    """Path of the cached PDF for these employee and payroll fields.
+
+    The file name is a SHA-256 of the fields, sharded into subdirectories by
+    its first two hex digits.
+    """
+    values = [PAYSLIP_CACHE_VERSION]
+    for field in PAYSLIP_CACHE_FIELDS:
+        source = employee_data if field in ('name', 'designation',
+                                            'department') else payroll_data
+        values.append(source[field])
+    key = hashlib.sha256(json.dumps(values, default=str).encode()).hexdigest()
+    return os.path.join(app.config['PAYSLIP_CACHE_DIR'], key[:2],
+                        f'{key}.pdf')
+
+
+def _scan_payslip_cache():
+    """(mtime, size, path) of every cached PDF"""
+    entries = []
+    for root, _, files in os.walk(app.config['PAYSLIP_CACHE_DIR']):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    return entries
+
+
+def _evict_payslip_cache(added, keep):
+    """Account for a newly cached file and trim the cache if it is too big.
+
+    The running size is per process and only an estimate when several
+    processes share the directory, so eviction rescans the directory and
+    removes the least recently used files (hits refresh the mtime) until the
+    cache is back under 90% of PAYSLIP_CACHE_MAX_MB. The file at keep, just
+    written by the caller, is never removed.
+    """
+    global _payslip_cache_size
+    limit = app.config['PAYSLIP_CACHE_MAX_MB'] * 1024 * 1024
+    with _payslip_cache_lock:
+        if _payslip_cache_size is None:
+            _payslip_cache_size = sum(
+                size for _, size, _ in _scan_payslip_cache())
+        else:
+            _payslip_cache_size += added
+        if _payslip_cache_size <= limit:
+            return
+
+        entries = sorted(_scan_payslip_cache())
+        _payslip_cache_size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if _payslip_cache_size <= limit * 0.9:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            _payslip_cache_size -= size
+
+
+def touch_cached_payslip(path):
+    """Whether path is cached, refreshing its mtime so eviction keeps it"""
     try:
-        msg = MIMEMultipart()
-        msg['From'] = "stud.studentsmart@gmail.com"
-        msg['To'] = employee_email
-        msg['Subject'] = f"Payslip for {month} {year}"
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def cached_payslip_pdf(employee_data, payroll_data):
+    """Return the path of the payslip PDF, rendering it on a cache miss"""
+    path = payslip_cache_path(employee_data, payroll_data)
+    if touch_cached_payslip(path):
+        return path
+
+    pdf_bytes = generate_payslip_pdf(employee_data, payroll_data).getvalue()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Written under a temporary name and renamed, so readers never see a
+    # partial file
+    temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(pdf_bytes)
+    os.replace(temp_path, path)
+    _evict_payslip_cache(len(pdf_bytes), keep=path)
+    return path
+
+
+_payslip_pool = None
+_payslip_pool_users = 0
+_payslip_pool_lock = threading.Lock()
+
+
+@contextmanager
+def payslip_pool():
+    """Process pool for payslip rendering, shared by concurrent batches.
+
+    The pool is started by the first batch and shut down when the last one
+    finishes, so idle web processes do not keep render workers alive.
+    """
+    global _payslip_pool, _payslip_pool_users
+    with _payslip_pool_lock:
+        if _payslip_pool is None:
+            # Spawned rather than forked so the children never inherit the
+            # parent's open SQLite connections
+            _payslip_pool = ProcessPoolExecutor(
+                max_workers=app.config['PAYSLIP_RENDER_WORKERS'],
+                mp_context=multiprocessing.get_context('spawn'))
+        _payslip_pool_users += 1
+        pool = _payslip_pool
+    try:
+        yield pool
+    finally:
+        idle = None
+        with _payslip_pool_lock:
+            _payslip_pool_users -= 1
+            if _payslip_pool_users == 0:
+                idle, _payslip_pool = _payslip_pool, None
+        if idle is not None:
+            idle.shutdown(wait=True, cancel_futures=True)
+
+
+def drop_payslip_pool(pool):
+    """Stop handing out a broken pool so the next batch starts a new one"""
+    global _payslip_pool
+    with _payslip_pool_lock:
+        if _payslip_pool is pool:
+            _payslip_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def render_payslip_bytes(record):
+    """Pool task: payslip PDF bytes for a joined payroll/employee dict.
+
+    Workers read and fill the same on-disk cache as the request handlers.
+    """
+    with open(cached_payslip_pdf(record, record), 'rb') as f:
+        return f.read()
+
+
+def iter_payslip_pdfs(records):
+    """Render payslips for payroll records, yielding as each one completes.
+
+    records are plain dicts holding the payroll row plus the employee's name,
+    designation and department (sqlite3.Row does not pickle). Yields
+    (record, pdf_buffer, error) tuples in completion order; error is None on
+    success. Payslips already in the on-disk cache are read directly. At most
+    a few tasks per worker are in flight, so finished PDFs do not pile up
+    while the consumer is busy sending them.
+    """
+    workers = app.config['PAYSLIP_RENDER_WORKERS']
+
+    def render_here(record):
+        try:
+            return record, BytesIO(render_payslip_bytes(record)), None
+        except Exception as e:
+            return record, None, e
+
+    if workers <= 1:
+        for record in records:
+            yield render_here(record)
+        return
+
+    with payslip_pool() as pool:
+        records = iter(records)
+        in_flight = {}
+        # Records left to render in this process once the pool has broken
+        fallback = None
+        while fallback is None:
+            # Top up the window; cached payslips are read here and never go
+            # through the pool
+            for record in records:
+                path = payslip_cache_path(record, record)
+                try:
+                    touch_cached_payslip(path)
+                    with open(path, 'rb') as f:
+                        cached = f.read()
+                except FileNotFoundError:
+                    try:
+                        in_flight[pool.submit(render_payslip_bytes,
+                                              record)] = record
+                    except BrokenProcessPool:
+                        fallback = [record]
+                        break
+                else:
+                    yield record, BytesIO(cached), None
+                    continue
+                if len(in_flight) >= workers * 4:
+                    break
+
+            if fallback is not None or not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                record = in_flight.pop(future)
+                try:
+                    yield record, BytesIO(future.result()), None
+                except BrokenProcessPool:
+                    fallback = [record]
+                    break
+                except Exception as e:
+                    yield record, None, e
+
+        if fallback is None:
+            return
+
+        # A worker died; drop the pool so the next batch gets a new one, and
+        # finish this batch here rather than lose it
+        logging.warning('Payslip render pool broke; rendering the rest in-process')
+        drop_payslip_pool(pool)
+        for future, record in in_flight.items():
+            if future.done() and future.exception() is None:
+                yield record, BytesIO(future.result()), None
+            else:
+                fallback.append(record)
+        for record in itertools.chain(fallback, records):
+            yield render_here(record)
+
+
+class ZipStreamBuffer(RawIOBase):
+    """Write-only, unseekable sink for zipfile that is drained as it fills.
+
+    zipfile falls back to data descriptors when it cannot seek, so entries
+    can be handed to the client as soon as each one is written.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_payslip_zip(records, month, year):
+    """Yield a ZIP archive of the payslips for records, piece by piece.
+
+    PDFs come from iter_payslip_pdfs, so they are rendered in parallel and
+    served from the payslip cache where possible. They are already
+    compressed and stored as-is. Payslips that fail to render are listed in
+    errors.txt at the end of the archive.
+    """
+    buffer = ZipStreamBuffer()
+    errors = []
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for record, payslip_pdf, error in iter_payslip_pdfs(records):
+            if error is not None:
+                logging.error(
+                    f"Error generating payslip for {record['name']}: {str(error)}"
+                )
+                errors.append(f"{record['emp_id']}\t{record['name']}\t{error}")
+                continue
 
-        body = f"""
+            archive.writestr(
+                f"payslip_{record['emp_id']}_{month}_{year}.pdf",
+                payslip_pdf.getvalue())
+            yield buffer.drain()
+
+        if errors:
+            archive.writestr('errors.txt', '\n'.join(errors) + '\n')
+    yield buffer.drain()
+
+
+# Payroll report columns: header and the SQL expression it is read from
+PAYROLL_REPORT_COLUMNS = (
+    ('Employee ID', 'p.emp_id'),
+    ('Name', 'e.name'),
+    ('Email', 'e.email'),
+    ('Designation', "COALESCE(e.designation, 'N/A')"),
+    ('Department', "COALESCE(e.department, 'N/A')"),
+    ('Month', 'p.month'),
+    ('Year', 'p.year'),
+    ('Days Worked', 'p.days_worked'),
+    ('Basic Salary', 'p.basic_salary'),
+    ('HRA', 'p.hra'),
+    ('Travel Allowance', 'p.travel_allowance'),
+    ('Medical Allowance', 'p.medical_allowance'),
+    ('LTA', 'p.lta'),
+    ('Special Allowance', 'p.special_allowance'),
+    ('Gross Salary', 'p.gross_salary'),
+    ('PF Deduction', 'p.pf_deduction'),
+    ('Net Salary', 'p.net_salary'),
+    ('Hike Amount', 'p.hike_amount'),
+    ('Processed Date', 'p.processed_at'),
+)
+# Rows fetched from the cursor per CSV chunk
+PAYROLL_REPORT_FETCH_ROWS = 1000
+
+
+def payroll_report_cursor(conn, period):
+    """Cursor over the period's report rows as plain tuples, ordered by name"""
+    return tuple_cursor(conn).execute(
+        f'''
+        SELECT {', '.join(column for _, column in PAYROLL_REPORT_COLUMNS)}
+        FROM payroll p
+        JOIN employees e ON p.emp_id = e.emp_id
+        WHERE p.period = ?
+        ORDER BY e.name
+    ''', (period, ))
+
+
+def payroll_report_summary(summary):
+    """Summary sheet rows from the period's payroll_monthly_summary row"""
+    count = summary['payroll_count']
+    return [
+        ('Total Employees', count),
+        ('Total Gross Salary', f"₹{summary['total_gross']:.2f}"),
+        ('Total PF Deduction', f"₹{summary['total_pf']:.2f}"),
+        ('Total Net Salary', f"₹{summary['total_net']:.2f}"),
+        ('Average Gross Salary', f"₹{summary['total_gross'] / count:.2f}"),
+        ('Average Net Salary', f"₹{summary['total_net'] / count:.2f}"),
+    ]
+
+
+def write_payroll_report_xlsx(output, rows, sheet_name, summary_rows):
+    """Write the payroll report workbook to output, one row at a time.
+
+    Uses an openpyxl write-only workbook, which spools each row to disk as
+    it is appended, so rows may be a database cursor of any size.
+    """
+    workbook = Workbook(write_only=True)
+    header_font = Font(bold=True)
+
+    def header(sheet, titles):
+        cells = []
+        for title in titles:
+            cell = WriteOnlyCell(sheet, value=title)
+            cell.font = header_font
+            cells.append(cell)
+        sheet.append(cells)
+
+    sheet = workbook.create_sheet(sheet_name)
+    header(sheet, [title for title, _ in PAYROLL_REPORT_COLUMNS])
+    for row in rows:
+        sheet.append(row)
+
+    summary_sheet = workbook.create_sheet('Summary')
+    header(summary_sheet, ['Metric', 'Value'])
+    for row in summary_rows:
+        summary_sheet.append(row)
+
+    workbook.save(output)
+
+
+class CSVStreamBuffer:
+    """File-like sink for csv.writer that is drained as it fills"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(data)
+
+    def drain(self):
+        data = ''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_payroll_report_csv(cursor):
+    """Yield the payroll report as CSV, a batch of cursor rows at a time"""
+    buffer = CSVStreamBuffer()
+    writer = csv.writer(buffer)
+    writer.writerow([title for title, _ in PAYROLL_REPORT_COLUMNS])
+    while True:
+        rows = cursor.fetchmany(PAYROLL_REPORT_FETCH_ROWS)
+        if not rows:
+            break
+        writer.writerows(rows)
+        yield buffer.drain()
+    yield buffer.drain()
+
+
+# Payroll history export columns: name, SQL expression and Arrow type name.
+# Dates and timestamps are converted in SQL so the values arrive typed
+PAYROLL_EXPORT_COLUMNS = (
+    ('emp_id', 'p.emp_id', 'string'),
+    ('name', 'e.name', 'string'),
+    ('email', 'e.email', 'string'),
+    ('designation', 'e.designation', 'category'),
+    ('department', 'e.department', 'category'),
+    ('joining_date',
+     "CAST(julianday(e.joining_date) - 2440587.5 AS INTEGER)", 'date'),
+    ('ctc_monthly', 'e.ctc_monthly', 'float64'),
+    ('pf_opted', 'e.pf_opted', 'bool'),
+    ('period', 'p.period', 'int32'),
+    ('month', 'p.month', 'category'),
+    ('year', 'p.year', 'int16'),
+    ('days_worked', 'p.days_worked', 'int16'),
+    ('basic_salary', 'p.basic_salary', 'float64'),
+    ('hra', 'p.hra', 'float64'),
+    ('travel_allowance', 'p.travel_allowance', 'float64'),
+    ('medical_allowance', 'p.medical_allowance', 'float64'),
+    ('lta', 'p.lta', 'float64'),
+    ('special_allowance', 'p.special_allowance', 'float64'),
+    ('employer_pf', 'p.employer_pf', 'float64'),
+    ('employee_pf', 'p.employee_pf', 'float64'),
+    ('pf_deduction', 'p.pf_deduction', 'float64'),
+    ('gross_salary', 'p.gross_salary', 'float64'),
+    ('net_salary', 'p.net_salary', 'float64'),
+    ('hike_amount', 'p.hike_amount', 'float64'),
+    ('processed_at', "CAST(strftime('%s', p.processed_at) AS INTEGER)",
+     'timestamp'),
+)
+PAYROLL_EXPORT_FORMATS = ('parquet', 'arrow')
+
+
+def import_pyarrow():
+    """pyarrow and pyarrow.parquet, imported on first use of an export"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError(
+            'Payroll exports need pyarrow; install it with pip install pyarrow'
+        ) from e
+    return pyarrow, pyarrow.parquet
+
+
+def payroll_export_schema(pa):
+    """Arrow schema of PAYROLL_EXPORT_COLUMNS"""
+    types = {
+        'string': pa.string(),
+        'category': pa.dictionary(pa.int32(), pa.string()),
+        'date': pa.date32(),
+        'timestamp': pa.timestamp('s'),
+        'bool': pa.bool_(),
+        'int16': pa.int16(),
+        'int32': pa.int32(),
+        'float64': pa.float64(),
+    }
+    return pa.schema([(name, types[kind])
+                      for name, _, kind in PAYROLL_EXPORT_COLUMNS])
+
+
+def iter_payroll_export_batches(conn, pa, schema, period_from, period_to,
+                                batch_rows):
+    """Yield Arrow record batches of payroll history between two periods.
+
+    Rows are read from a tuple cursor batch_rows at a time, in period and
+    employee order, so only one batch is held in memory. Category columns
+    share one dictionary that only grows, so each batch's dictionary extends
+    the last one and Arrow IPC can write it as a delta.
+    """
+    categories = {
+        field.name: {}
+        for field in schema if pa.types.is_dictionary(field.type)
+    }
+    storage = {pa.date32(): pa.int32(), pa.bool_(): pa.int8()}
+    cursor = tuple_cursor(conn).execute(
+        f'''
+        SELECT {', '.join(column for _, column, _ in PAYROLL_EXPORT_COLUMNS)}
+        FROM payroll p
+        JOIN employees e ON p.emp_id = e.emp_id
+        WHERE p.period BETWEEN ? AND ?
+        ORDER BY p.period, p.emp_id
+    ''', (period_from, period_to))
+
+    while True:
+        rows = cursor.fetchmany(batch_rows)
+        if not rows:
+            break
+        columns = []
+        for field, values in zip(schema, zip(*rows)):
+            if field.name in categories:
+                lookup = categories[field.name]
+                indices = [
+                    None if value is None else lookup.setdefault(
+                        value, len(lookup)) for value in values
+                ]
+                columns.append(
+                    pa.DictionaryArray.from_arrays(
+                        pa.array(indices, pa.int32()),
+                        pa.array(list(lookup), pa.string())))
+            elif field.type in storage:
+                # Integers from SQL: days since the epoch, or 0/1 flags
+                columns.append(
+                    pa.array(values, storage[field.type]).cast(field.type))
+            else:
+                columns.append(pa.array(values, field.type))
+        yield pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def payroll_export_partitions(conn, period_from, period_to, partition_by=None):
+    """(relative path, period_from, period_to) of each file in an export.
+
+    Without partitioning that is a single payroll file; partitioned by year
+    it is one year=YYYY/payroll file per year that has payroll, with the
+    range clipped to that year.
+    """
+    if partition_by is None:
+        return [('payroll', period_from, period_to)]
+    if partition_by != 'year':
+        raise ValueError(f'Unsupported partition: {partition_by}')
+
+    years = conn.execute(
+        '''
+        SELECT DISTINCT period / 100 FROM payroll
+        WHERE period BETWEEN ? AND ?
+        ORDER BY 1
+    ''', (period_from, period_to)).fetchall()
+    return [(f'year={year}/payroll', max(period_from, year * 100 + 1),
+             min(period_to, year * 100 + 12)) for (year, ) in years]
+
+
+def write_payroll_export(conn, output, export_format, period_from, period_to):
+    """Write one payroll history file to output and return its row count.
+
+    Parquet is written one row group per batch and Arrow IPC one record
+    batch at a time, both zstd-compressed.
+    """
+    pa, pq = import_pyarrow()
+    schema = payroll_export_schema(pa)
+    batches = iter_payroll_export_batches(conn, pa, schema, period_from,
+                                          period_to,
+                                          app.config['EXPORT_BATCH_ROWS'])
+    if export_format == 'parquet':
+        writer = pq.ParquetWriter(output, schema, compression='zstd')
+    elif export_format == 'arrow':
+        writer = pa.ipc.new_file(
+            output,
+            schema,
+            options=pa.ipc.IpcWriteOptions(compression='zstd',
+                                           emit_dictionary_deltas=True))
+    else:
+        raise ValueError(f'Unsupported export format: {export_format}')
+
+    rows = 0
+    with writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def iter_payroll_export_zip(conn, partitions, export_format):
+    """Yield a ZIP of a partitioned export, one partition file at a time.
+
+    Each partition is written to a temporary file and then copied into the
+    archive. The files are compressed already, so they are stored as-is.
+    """
+    buffer = ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for path, period_from, period_to in partitions:
+            with tempfile.TemporaryFile() as part:
+                write_payroll_export(conn, part, export_format, period_from,
+                                     period_to)
+                part.seek(0)
+                with archive.open(f'{path}.{export_format}', 'w',
+                                  force_zip64=True) as entry:
+                    while chunk := part.read(1024 * 1024):
+                        entry.write(chunk)
+                        yield buffer.drain()
+    yield buffer.drain()
+
+
+@app.cli.command('export-payroll')
+@click.argument('destination')
+@click.option('--from', 'period_from', required=True,
+              help='First period, as yyyymm or yyyy-mm')
+@click.option('--to', 'period_to', required=True,
+              help='Last period, as yyyymm or yyyy-mm')
+@click.option('--format', 'export_format', default='parquet',
+              type=click.Choice(PAYROLL_EXPORT_FORMATS))
+@click.option('--partition-by', type=click.Choice(['year']), default=None)
+def export_payroll_command(destination, period_from, period_to, export_format,
+                           partition_by):
+    """Export payroll history joined with employees to a columnar file.
+
+    Writes DESTINATION/payroll.<format>, or one
+    DESTINATION/year=YYYY/payroll.<format> per year with --partition-by year.
+    """
+    conn = get_db_connection()
+    partitions = payroll_export_partitions(conn, parse_period(period_from),
+                                           parse_period(period_to),
+                                           partition_by)
+    for path, first, last in partitions:
+        file_path = os.path.join(destination, f'{path}.{export_format}')
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as output:
+            rows = write_payroll_export(conn, output, export_format, first,
+                                        last)
+        click.echo(f'{file_path}: {rows} rows')
+
+
+class SMTPSession:
+    """One authenticated SMTP connection reused for many messages.
+
+    Connects on first send, reconnects once when the server drops the
+    connection, and starts a fresh session after MAIL_MESSAGES_PER_SESSION
+    messages.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.server = None
+        self.sent_in_session = 0
+
+    def connect(self):
+        server = smtplib.SMTP(self.config['MAIL_SERVER'],
+                              self.config['MAIL_PORT'],
+                              timeout=self.config['MAIL_TIMEOUT'])
+        try:
+            if self.config['MAIL_USE_TLS']:
+                server.starttls()
+            if self.config['MAIL_USE_AUTH']:
+                server.login(self.config['MAIL_USERNAME'],
+                             self.config['MAIL_PASSWORD'])
+        except Exception:
+            server.close()
+            raise
+        self.server = server
+        self.sent_in_session = 0
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except (smtplib.SMTPException, OSError):
+            self.server.close()
+        self.server = None
+
+    def send(self, msg):
+        if self.sent_in_session >= self.config['MAIL_MESSAGES_PER_SESSION']:
+            self.close()
+
+        for attempt in range(2):
+            if self.server is None:
+                self.connect()
+            try:
+                self.server.send_message(msg)
+                self.sent_in_session += 1
+                return
+            except (smtplib.SMTPServerDisconnected,
+                    smtplib.SMTPResponseException) as e:
+                # 421 is the server closing the session, e.g. an idle timeout
+                if (isinstance(e, smtplib.SMTPResponseException)
+                        and e.smtp_code != 421):
+                    raise
+                self.server.close()
+                self.server = None
+                if attempt:
+                    raise
+
+
+class SMTPPool:
+    """A fixed set of SMTP sessions shared by the senders of one batch"""
+
+    def __init__(self, config, size=None):
+        self.sessions = queue.Queue()
+        for _ in range(size or config['MAIL_SESSIONS']):
+            self.sessions.put(SMTPSession(config))
+
+    @contextmanager
+    def session(self):
+        session = self.sessions.get()
+        try:
+            yield session
+        finally:
+            self.sessions.put(session)
+
+    def send(self, msg):
+        with self.session() as session:
+            session.send(msg)
+
+    def close(self):
+        while not self.sessions.empty():
+            self.sessions.get_nowait().close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def build_payslip_message(employee_email, employee_name, payslip_pdf, month,
+                          year):
+    """Build the payslip email with the PDF attached"""
+    msg = MIMEMultipart()
+    msg['From'] = app.config['MAIL_SENDER']
+    msg['To'] = employee_email
+    msg['Subject'] = f"Payslip for {month} {year}"
+
+    body = f"""
         Dear {employee_name},
         
         Please find attached your payslip for {month} {year}.
@@ -1474,27 +2145,750 @@ def send_payslip_email(employee_email, employee_name, payslip_pdf, month,
         HR Team
         """
 
-        msg.attach(MIMEText(body, 'plain'))
+    msg.attach(MIMEText(body, 'plain'))
+
+    # Attach PDF
+    part = MIMEBase('application', 'octet-stream')
+    part.set_payload(payslip_pdf.read())
+    encoders.encode_base64(part)
+    part.add_header('Content-Disposition',
+                    f'attachment; filename="payslip_{month}_{year}.pdf"')
+    msg.attach(part)
+
+    return msg
+
+
+def mail_config_error(config):
+    """Why payslips cannot be mailed with config, or None if they can"""
+    if config['MAIL_USE_AUTH'] and not (config['MAIL_USERNAME']
+                                        and config['MAIL_PASSWORD']):
+        return ('Email is not configured: set MAIL_USERNAME and '
+                'MAIL_PASSWORD, or MAIL_USE_AUTH=false for a relay that '
+                'takes no login')
+    if not config['MAIL_SENDER']:
+        return 'Email is not configured: set MAIL_SENDER'
+    return None
+
+
+def send_payslip_email(employee_email,
+                       employee_name,
+                       payslip_pdf,
+                       month,
+                       year,
+                       mailer=None,
+                       timer=None):
+    """Send payslip via email.
+
+    Pass an SMTPPool (or SMTPSession) as mailer to reuse its authenticated
+    sessions; without one a session is opened just for this message. SMTP
+    and connection errors are raised to the caller, which decides whether
+    they are worth retrying (see is_transient_mail_error). A StageTimer
+    collects the time spent building the MIME message and in SMTP.
+    """
+    started = time.perf_counter()
+    msg = build_payslip_message(employee_email, employee_name, payslip_pdf,
+                                month, year)
+    built = time.perf_counter()
 
-        # Attach PDF
-        part = MIMEBase('application', 'octet-stream')
-        part.set_payload(payslip_pdf.read())
-        encoders.encode_base64(part)
-        part.add_header('Content-Disposition',
-                        f'attachment; filename="payslip_{month}_{year}.pdf"')
-        msg.attach(part)
+    try:
+        if mailer is not None:
+            mailer.send(msg)
+        else:
+            session = SMTPSession(app.config)
+            try:
+                session.send(msg)
+            finally:
+                session.close()
+    finally:
+        if timer is not None:
+            timer.add('mime', built - started)
+            timer.add('smtp', time.perf_counter() - built)
 
-        # SMTP configuration
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login("stud.studentsmart@gmail.com", "jygr uhcl odmk flve")
-        server.send_message(msg)
-        server.quit()
 
-        return True
+class StageTimer:
+    """Thread-safe running totals of seconds spent per stage of a job"""
+
+    def __init__(self):
+        self.totals = {}
+        self.lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self.lock:
+            self.totals[stage] = self.totals.get(stage, 0) + seconds
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                f'{stage}_seconds': round(seconds, 3)
+                for stage, seconds in self.totals.items()
+            }
+
+
+def is_transient_mail_error(error):
+    """Whether a failed send may succeed later.
+
+    SMTP 4xx replies, dropped connections and network errors are transient;
+    5xx replies (unknown mailbox, rejected message, bad credentials) and
+    anything else, such as a payslip that failed to render, are not.
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPException, OSError))
+
+
+# Due rows are moved to 'sending' under the claiming job's id in a single
+# statement, so concurrent jobs never pick up the same row
+PAYSLIP_OUTBOX_CLAIM_SQL = '''
+    UPDATE payslip_outbox SET status = 'sending', claimed_by = ?
+    WHERE id IN (
+        SELECT o.id FROM payslip_outbox o
+        JOIN payroll p ON p.emp_id = o.emp_id AND p.period = o.period
+        JOIN employees e ON e.emp_id = o.emp_id
+        WHERE o.period = ? AND o.status = 'pending'
+          AND o.next_attempt_at <= CURRENT_TIMESTAMP
+    )
+'''
+
+PAYSLIP_OUTBOX_CLAIMED_SQL = '''
+    SELECT o.id AS outbox_id, o.attempts, o.retry_base, p.*, e.name, e.email, e.designation,
+           e.department
+    FROM payslip_outbox o
+    JOIN payroll p ON p.emp_id = o.emp_id AND p.period = o.period
+    JOIN employees e ON e.emp_id = o.emp_id
+    WHERE o.period = ? AND o.status = 'sending' AND o.claimed_by = ?
+    ORDER BY o.id
+'''
+
+
+def record_outbox_failure(conn, record, error):
+    """Schedule a retry for a failed delivery, or mark it failed for good.
+
+    attempts counts every try; the retry budget and backoff only count the
+    tries since the row was last queued, at retry_base. Returns the row's
+    new status, 'pending' or 'failed'.
+    """
+    attempts = record['attempts'] + 1
+    tries = attempts - record['retry_base']
+    if (is_transient_mail_error(error)
+            and tries < app.config['MAIL_MAX_ATTEMPTS']):
+        status = 'pending'
+        delay = app.config['MAIL_RETRY_BASE_SECONDS'] * 2**(tries - 1)
+    else:
+        status = 'failed'
+        delay = 0
+
+    with conn:
+        conn.execute(
+            '''
+            UPDATE payslip_outbox
+            SET status = ?, attempts = ?, last_error = ?,
+                next_attempt_at = datetime('now', ?)
+            WHERE id = ?
+        ''', (status, attempts, str(error), f'+{delay} seconds',
+              record['outbox_id']))
+    return status
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing rate_per_minute sends on average.
+
+    Up to burst tokens accumulate while idle; acquire() blocks until one is
+    available.
+    """
+
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60
+        self.capacity = burst or max(1, self.rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity,
+                                  self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+_mail_rate_limiters = {}
+_mail_rate_limiters_lock = threading.Lock()
+
+
+def get_mail_rate_limiter(config):
+    """Token bucket shared by every sender to the configured SMTP provider.
+
+    Buckets are keyed by server and port, so concurrent jobs in a process
+    draw on the same quota. Returns None when MAIL_RATE_PER_MINUTE is 0.
+    """
+    if not config['MAIL_RATE_PER_MINUTE']:
+        return None
+    key = (config['MAIL_SERVER'], config['MAIL_PORT'])
+    with _mail_rate_limiters_lock:
+        if key not in _mail_rate_limiters:
+            _mail_rate_limiters[key] = TokenBucket(config['MAIL_RATE_PER_MINUTE'],
+                                                   config['MAIL_RATE_BURST'])
+        return _mail_rate_limiters[key]
+
+
+def dispatch_payslip_outbox(conn, period, month, year, progress, timer=None):
+    """Deliver the period's pending outbox rows until none are left.
+
+    MAIL_SESSIONS sender threads each keep one SMTP session busy, throttled
+    by the provider's token bucket, while PDFs keep coming from the render
+    pool. Outcomes are written back here on the job's thread, which owns the
+    database connection. Due rows are claimed for the progress's job before
+    anything is rendered, so a concurrent job cannot send them too, and each
+    row is committed as sent the moment its message is accepted, so an
+    interrupted run never re-sends it. Transient
+    failures are retried after their backoff expires, while the job waits;
+    the progress heartbeat is kept alive meanwhile.
+
+    timer, a StageTimer, accumulates time waiting for PDFs ('pdf'), building
+    messages ('mime') and talking SMTP ('smtp'); the last two are summed over
+    the sender threads.
+    """
+    timer = timer or StageTimer()
+    sessions = app.config['MAIL_SESSIONS']
+    rate_limiter = get_mail_rate_limiter(app.config)
+
+    def send(record, payslip_pdf):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        send_payslip_email(record['email'],
+                           record['name'],
+                           payslip_pdf,
+                           month,
+                           year,
+                           mailer=mailer,
+                           timer=timer)
+
+    def record_outcome(record, error):
+        if error is None:
+            with conn:
+                conn.execute(
+                    '''
+                    UPDATE payslip_outbox
+                    SET status = 'sent', attempts = attempts + 1,
+                        last_error = NULL, sent_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (record['outbox_id'], ))
+            progress.add(done=1)
+            return
+
+        logging.error(
+            f"Error sending payslip to {record['name']}: {str(error)}")
+        if record_outbox_failure(conn, record, error) == 'failed':
+            progress.add(failed=1)
+
+    def collect(futures, return_when):
+        done, _ = wait(futures, return_when=return_when)
+        for future in done:
+            record_outcome(futures.pop(future), future.exception())
+
+    with SMTPPool(app.config, size=sessions) as mailer, ThreadPoolExecutor(
+            max_workers=sessions, thread_name_prefix='payslip-sender') as senders:
+        while True:
+            with conn:
+                conn.execute(PAYSLIP_OUTBOX_CLAIM_SQL,
+                             (progress.job_id, period))
+            due = [
+                dict(record) for record in conn.execute(
+                    PAYSLIP_OUTBOX_CLAIMED_SQL, (period, progress.job_id))
+            ]
+
+            # A couple of messages per session are queued, so no session
+            # idles while the next PDF is rendered
+            in_flight = {}
+            payslips = iter_payslip_pdfs(due)
+            while True:
+                started = time.perf_counter()
+                item = next(payslips, None)
+                timer.add('pdf', time.perf_counter() - started)
+                if item is None:
+                    break
+
+                record, payslip_pdf, error = item
+                if error is not None:
+                    record_outcome(record, error)
+                    continue
+                if len(in_flight) >= sessions * 2:
+                    collect(in_flight, FIRST_COMPLETED)
+                in_flight[senders.submit(send, record, payslip_pdf)] = record
+            if in_flight:
+                collect(in_flight, ALL_COMPLETED)
+
+            if due:
+                continue
+
+            # Rows whose payroll record or employee was deleted after they
+            # were queued can never come due; fail them rather than wait
+            with conn:
+                orphaned = conn.execute(
+                    '''
+                    UPDATE payslip_outbox
+                    SET status = 'failed',
+                        last_error = 'Payroll record or employee no longer exists'
+                    WHERE period = ? AND status = 'pending'
+                      AND NOT EXISTS (
+                          SELECT 1 FROM payroll p
+                          JOIN employees e ON e.emp_id = p.emp_id
+                          WHERE p.emp_id = payslip_outbox.emp_id
+                            AND p.period = payslip_outbox.period
+                      )
+                ''', (period, )).rowcount
+            if orphaned:
+                progress.add(failed=orphaned)
+
+            # Nothing is due; wait for the earliest scheduled retry, if any
+            wait_seconds = conn.execute(
+                '''
+                SELECT MIN(strftime('%s', next_attempt_at)) - strftime('%s', 'now')
+                FROM payslip_outbox
+                WHERE period = ? AND status = 'pending'
+            ''', (period, )).fetchone()[0]
+            if wait_seconds is None:
+                return
+            time.sleep(min(max(wait_seconds, 0), 30))
+            progress.flush(force=True)
+
+
+# Background jobs: long-running operations are queued in the jobs table and run
+# by worker threads outside the request cycle
+JOB_HANDLERS = {}
+
+_job_wakeup = threading.Event()
+_job_workers_lock = threading.Lock()
+_job_workers_pid = None
+
+
+def job_handler(kind):
+    """Register a function as the handler for jobs of the given kind.
+
+    Handlers are called as handler(progress, **payload) inside an app
+    context and return a JSON-serialisable result dict.
+    """
+
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+
+    return register
+
+
+def enqueue_job(conn, kind, **payload):
+    """Queue a job and return its id; workers run jobs in FIFO order"""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job kind: {kind}')
+    with conn:
+        job_id = conn.execute('INSERT INTO jobs (kind, payload) VALUES (?, ?)',
+                              (kind, json.dumps(payload))).lastrowid
+    _job_wakeup.set()
+    return job_id
+
+
+def enqueue_period_job(conn, kind, month, year, **payload):
+    """Queue a job for a payroll period unless one is already pending.
+
+    Returns the id of the new job, or of the queued or running job of the
+    same kind for that month and year, so a double-clicked send is only run
+    once.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job kind: {kind}')
+    payload = dict(payload, month=month, year=year)
+    with conn:
+        # Check and insert in one statement, so two requests cannot both
+        # find no job and each add one
+        job_id = conn.execute(
+            '''
+            INSERT INTO jobs (kind, payload)
+            SELECT ?, ? WHERE NOT EXISTS (
+                SELECT 1 FROM jobs
+                WHERE kind = ? AND status IN ('queued', 'running')
+                  AND json_extract(payload, '$.month') = ?
+                  AND json_extract(payload, '$.year') = ?
+            )
+            RETURNING id
+        ''', (kind, json.dumps(payload), kind, month, year)).fetchall()
+        if not job_id:
+            return conn.execute(
+                '''
+                SELECT id FROM jobs
+                WHERE kind = ? AND status IN ('queued', 'running')
+                  AND json_extract(payload, '$.month') = ?
+                  AND json_extract(payload, '$.year') = ?
+                ORDER BY id LIMIT 1
+            ''', (kind, month, year)).fetchone()[0]
+    _job_wakeup.set()
+    return job_id[0][0]
+
+
+class JobProgress:
+    """Done/failed counters of a running job, written back to its row.
+
+    Writes go through a connection of their own so they never commit part of
+    the handler's transaction, and are throttled to one per interval. Each
+    write also refreshes the job's heartbeat.
+    """
+
+    def __init__(self, job_id, interval=1.0):
+        self.job_id = job_id
+        self.interval = interval
+        self.total = None
+        self.done = 0
+        self.failed = 0
+        self._flushed_at = 0.0
+        self._conn = open_db_connection()
+
+    def set_total(self, total):
+        self.total = total
+        self.flush(force=True)
+
+    def add(self, done=0, failed=0):
+        self.done += done
+        self.failed += failed
+        self.flush()
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._flushed_at < self.interval:
+            return
+        self._flushed_at = now
+        with self._conn:
+            self._conn.execute(
+                '''
+                UPDATE jobs SET total = ?, done = ?, failed = ?,
+                                heartbeat_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (self.total, self.done, self.failed, self.job_id))
+
+    def finish(self, status, result=None, error=None):
+        if status == 'done':
+            self.total = self.done + self.failed
+        with self._conn:
+            self._conn.execute(
+                '''
+                UPDATE jobs SET status = ?, total = ?, done = ?, failed = ?,
+                                result = ?, error = ?,
+                                heartbeat_at = CURRENT_TIMESTAMP,
+                                finished_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (status, self.total, self.done, self.failed,
+                  json.dumps(result) if result is not None else None, error,
+                  self.job_id))
+        self._conn.close()
+
+
+def claim_job(conn):
+    """Atomically take the oldest queued job, or return None.
+
+    Running jobs whose heartbeat has gone stale lost their worker (a restart
+    or crash) and are marked failed rather than re-run, as a half-finished
+    mailing must not be sent twice. Payslips such a job had claimed but not
+    finished go back to pending for the next send.
+    """
+    with conn:
+        conn.execute(
+            '''
+            UPDATE jobs SET status = 'failed', finished_at = CURRENT_TIMESTAMP,
+                            error = 'Worker stopped before the job finished'
+            WHERE status = 'running' AND heartbeat_at < datetime('now', ?)
+        ''', (f"-{app.config['JOB_STALE_SECONDS']} seconds", ))
+        conn.execute('''
+            UPDATE payslip_outbox SET status = 'pending', claimed_by = NULL
+            WHERE status = 'sending' AND claimed_by NOT IN (
+                SELECT id FROM jobs WHERE status = 'running'
+            )
+        ''')
+        jobs = conn.execute('''
+            UPDATE jobs SET status = 'running', started_at = CURRENT_TIMESTAMP,
+                            heartbeat_at = CURRENT_TIMESTAMP
+            WHERE id = (SELECT id FROM jobs WHERE status = 'queued'
+                        ORDER BY id LIMIT 1)
+            RETURNING id, kind, payload
+        ''').fetchall()
+    return jobs[0] if jobs else None
+
+
+def run_job(job):
+    """Run a claimed job to completion and record its outcome"""
+    progress = JobProgress(job['id'])
+    try:
+        with app.app_context():
+            result = JOB_HANDLERS[job['kind']](progress,
+                                               **json.loads(job['payload']))
     except Exception as e:
-        logging.error(f"Email sending failed: {str(e)}")
-        return False
+        logging.exception(f"Job {job['id']} ({job['kind']}) failed")
+        progress.finish('failed', error=str(e))
+    else:
+        progress.finish('done', result)
+
+
+def job_worker_loop():
+    """Claim and run queued jobs forever, waiting between empty polls"""
+    while True:
+        try:
+            job = claim_job(get_db_connection())
+        except sqlite3.Error as e:
+            logging.error(f"Error claiming job: {str(e)}")
+            job = None
+
+        if job is None:
+            _job_wakeup.wait(app.config['JOB_POLL_SECONDS'])
+            _job_wakeup.clear()
+            continue
+
+        run_job(job)
+
+
+def start_job_workers():
+    """Start this process's job worker threads once, and again after a fork"""
+    global _job_workers_pid
+    if _job_workers_pid == os.getpid():
+        return
+    with _job_workers_lock:
+        if _job_workers_pid == os.getpid():
+            return
+        for number in range(app.config['JOB_WORKERS']):
+            threading.Thread(target=job_worker_loop,
+                             name=f'job-worker-{number}',
+                             daemon=True).start()
+        _job_workers_pid = os.getpid()
+
+
+@app.before_request
+def ensure_job_workers():
+    start_job_workers()
+
+
+@app.cli.command('run-job-worker')
+def run_job_worker():
+    """Run queued background jobs in the foreground until interrupted."""
+    job_worker_loop()
+
+
+@job_handler('send_payslips')
+def send_payslips_job(progress, month, year, failed_only=False):
+    """Deliver a month's payslips through the outbox.
+
+    A normal run adds an outbox row for every payroll record that has none
+    and sends the pending ones, so payslips already delivered are never sent
+    twice. With failed_only, rows that failed for good are reset and only
+    those are retried; each resend starts a fresh MAIL_MAX_ATTEMPTS budget,
+    while the attempts column keeps counting every try across resends.
+    """
+    config_error = mail_config_error(app.config)
+    if config_error:
+        raise RuntimeError(config_error)
+
+    conn = get_db_connection()
+    period = payroll_period(month, year)
+
+    with conn:
+        if failed_only:
+            conn.execute(
+                '''
+                UPDATE payslip_outbox
+                SET status = 'pending', retry_base = attempts,
+                    next_attempt_at = CURRENT_TIMESTAMP
+                WHERE period = ? AND status = 'failed'
+            ''', (period, ))
+        else:
+            conn.execute(
+                '''
+                INSERT INTO payslip_outbox (emp_id, period)
+                SELECT emp_id, period FROM payroll WHERE period = ?
+                ON CONFLICT (emp_id, period) DO NOTHING
+            ''', (period, ))
+
+    counts = dict(
+        conn.execute(
+            '''
+            SELECT status, COUNT(*) FROM payslip_outbox
+            WHERE period = ? GROUP BY status
+        ''', (period, )).fetchall())
+    progress.set_total(counts.get('pending', 0))
+
+    timer = StageTimer()
+    dispatch_payslip_outbox(conn, period, month, year, progress, timer)
+
+    message = f'Payslips sent successfully to {progress.done} employees. {progress.failed} failed.'
+    if counts.get('sent'):
+        message += f" {counts['sent']} already sent were skipped."
+    if not failed_only and counts.get('failed'):
+        message += f" {counts['failed']} that failed earlier were not retried."
+    return {'message': message, 'timings': timer.as_dict()}
+
+
+@job_handler('bulk_process_payroll')
+def bulk_process_payroll_job(progress, path, month, year):
+    conn = get_db_connection()
+    try:
+        progress.set_total(count_upload_rows(path))
+
+        # Each chunk is calculated and committed as it is read
+        for df in iter_upload_frames(path):
+            processed, errors = process_payroll_frame(conn, df, month, year)
+            progress.add(done=processed, failed=errors)
+    finally:
+        os.remove(path)
+
+    return {
+        'message':
+        f'Successfully processed {progress.done} payrolls. {progress.failed} errors.'
+    }
+
+
+@job_handler('bulk_add_employees')
+def bulk_add_employees_job(progress, path):
+    conn = get_db_connection()
+    rejects_name = f"rejects_employees_{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}.csv"
+    rejects_path = os.path.join(app.config['UPLOAD_FOLDER'], rejects_name)
+
+    def counted(frames):
+        # Rows count as done once staged; the final split into added and
+        # rejected is only known after the merge
+        for df in frames:
+            yield df
+            progress.add(done=len(df))
+
+    try:
+        progress.set_total(count_upload_rows(path))
+        added_count, rejected_count = import_employees(
+            conn, counted(iter_upload_frames(path)), rejects_path)
+    finally:
+        os.remove(path)
+
+    progress.done, progress.failed = added_count, rejected_count
+    return {
+        'message':
+        f'Successfully added {added_count} employees. {rejected_count} rows rejected.',
+        'rejects_file': rejects_name if rejected_count else None
+    }
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(error):
+    limit_mb = app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+    flash(f'File is too large! The upload limit is {limit_mb}MB.', 'error')
+    return redirect(url_for('dashboard'))
+
+
+@lru_cache(maxsize=64)
+def static_file_hash(path, mtime):
+    """Short content hash of a static file, recomputed when it changes"""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+@app.template_global()
+def static_url(filename):
+    """URL of a static file fingerprinted with its content hash.
+
+    The hash changes whenever the file does, so the URL can be cached as
+    immutable; see add_static_cache_headers.
+    """
+    path = os.path.join(app.static_folder, filename)
+    version = static_file_hash(path, os.stat(path).st_mtime_ns)
+    return url_for('static', filename=filename, v=version)
+
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/javascript', 'application/javascript',
+    'application/json'
+}
+
+
+def compress_bytes(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=app.config['COMPRESS_LEVEL'])
+    return gzip.compress(data,
+                         compresslevel=app.config['COMPRESS_LEVEL'],
+                         mtime=0)
+
+
+@lru_cache(maxsize=64)
+def compressed_static_file(path, mtime, encoding):
+    """Compressed body of a static file, kept until the file changes"""
+    with open(path, 'rb') as f:
+        return compress_bytes(f.read(), encoding)
+
+
+def accepted_encoding():
+    """Best compression the client accepts: br, gzip or None"""
+    if brotli is not None and request.accept_encodings['br']:
+        return 'br'
+    if request.accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+@app.after_request
+def add_static_cache_headers(response):
+    """Fingerprinted static files may be cached for good"""
+    if request.endpoint == 'static' and request.args.get('v'):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = app.config['STATIC_IMMUTABLE_MAX_AGE']
+        response.cache_control.immutable = True
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    """Compress HTML, JSON, CSS and JS bodies above COMPRESS_MIN_BYTES.
+
+    Streamed responses (ZIPs, CSV and NDJSON exports) and responses that
+    are already encoded are left alone. Static files are compressed once
+    and cached. A compressed response's ETag is made weak, as the bytes
+    differ from the uncompressed variant; If-None-Match compares weakly so
+    revalidation still works.
+    """
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+
+    if (response.status_code != 200
+            or 'Content-Encoding' in response.headers):
+        return response
+    encoding = accepted_encoding()
+    if encoding is None:
+        return response
+
+    if request.endpoint == 'static' and response.direct_passthrough:
+        if app.config['USE_X_SENDFILE']:
+            return response
+        length = response.content_length or 0
+        if length < app.config['COMPRESS_MIN_BYTES']:
+            return response
+        path = os.path.join(app.static_folder, request.view_args['filename'])
+        body = compressed_static_file(path, os.stat(path).st_mtime_ns,
+                                      encoding)
+        response.response.close()
+        response.direct_passthrough = False
+    elif response.is_streamed:
+        return response
+    else:
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_BYTES']:
+            return response
+        body = compress_bytes(data, encoding)
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
 
 
 @app.route('/')
@@ -1506,100 +2900,56 @@ def dashboard():
         'SELECT COUNT(*) FROM employees').fetchone()[0]
 
     # Get recent payroll entries
-    recent_payroll_raw = conn.execute('''
-        SELECT p.*, e.name 
-        FROM payroll p 
-        JOIN employees e ON p.emp_id = e.emp_id 
-        ORDER BY p.processed_at DESC 
+    recent_payroll = fetch_dicts(
+        conn, '''
+        SELECT p.emp_id, e.name, p.month, p.year, p.net_salary
+        FROM payroll p
+        JOIN employees e ON p.emp_id = e.emp_id
+        ORDER BY p.processed_at DESC
         LIMIT 5
-    ''').fetchall()
-
-    recent_payroll = []
-    for row in recent_payroll_raw:
-        recent_payroll.append({
-            'emp_id': row['emp_id'],
-            'name': row['name'],
-            'month': row['month'],
-            'year': row['year'],
-            'net_salary': row['net_salary']
-        })
+    ''')
 
-    # Get employees
-    employees_raw = conn.execute(
-        'SELECT * FROM employees ORDER BY name').fetchall()
-    employees = []
-    for row in employees_raw:
-        employees.append({
-            'emp_id': row['emp_id'],
-            'name': row['name'],
-            'email': row['email'],
-            'designation': row['designation'],
-            'department': row['department'],
-            'ctc_monthly': row['ctc_monthly'],
-            'pf_opted': row['pf_opted'],
-            'joining_date': row['joining_date']
-        })
+    # First few employees; the pickers and the full list page through
+    # /api/employees instead of rendering every employee here
+    employees = fetch_dicts(
+        conn, '''
+        SELECT emp_id, name, email, designation, department, ctc_monthly,
+               pf_opted, joining_date
+        FROM employees
+        ORDER BY name COLLATE NOCASE, emp_id
+        LIMIT 5
+    ''')
 
     # Get all payroll records
-    all_payroll_raw = conn.execute('''
-        SELECT p.*, e.name 
-        FROM payroll p 
-        JOIN employees e ON p.emp_id = e.emp_id 
-        ORDER BY p.processed_at DESC 
+    all_payroll = fetch_dicts(
+        conn, '''
+        SELECT p.emp_id, e.name, p.month, p.year, p.days_worked,
+               p.gross_salary, p.net_salary, p.basic_salary, p.hra,
+               p.travel_allowance, p.medical_allowance, p.lta,
+               p.special_allowance, p.pf_deduction, p.hike_amount
+        FROM payroll p
+        JOIN employees e ON p.emp_id = e.emp_id
+        ORDER BY p.period DESC, p.processed_at DESC
         LIMIT 20
-    ''').fetchall()
-
-    # Convert to dictionaries for JSON serialization
-    all_payroll = []
-    for row in all_payroll_raw:
-        all_payroll.append({
-            'emp_id': row['emp_id'],
-            'name': row['name'],
-            'month': row['month'],
-            'year': row['year'],
-            'days_worked': row['days_worked'],
-            'gross_salary': row['gross_salary'],
-            'net_salary': row['net_salary'],
-            'basic_salary': row['basic_salary'],
-            'hra': row['hra'],
-            'travel_allowance': row['travel_allowance'],
-            'medical_allowance': row['medical_allowance'],
-            'lta': row['lta'],
-            'special_allowance': row['special_allowance'],
-            'pf_deduction': row['pf_deduction'],
-            'hike_amount': row['hike_amount']
-        })
+    ''')
 
-    # Monthly payroll stats
-    monthly_stats_raw = conn.execute('''
-        SELECT month, year, COUNT(*) as count, SUM(net_salary) as total_payout
-        FROM payroll 
-        GROUP BY month, year 
-        ORDER BY year DESC, month DESC
+    # Monthly payroll stats, from the trigger-maintained summary table
+    monthly_stats = fetch_dicts(
+        conn, '''
+        SELECT month, year, payroll_count AS count,
+               ROUND(COALESCE(total_net, 0), 2) AS total_payout
+        FROM payroll_monthly_summary
+        ORDER BY period DESC
         LIMIT 6
-    ''').fetchall()
-
-    monthly_stats = []
-    for row in monthly_stats_raw:
-        monthly_stats.append({
-            'month':
-            row['month'],
-            'year':
-            row['year'],
-            'count':
-            row['count'],
-            'total_payout':
-            float(row['total_payout']) if row['total_payout'] else 0
-        })
-
-    conn.close()
+    ''')
 
-    return render_template_string(HTML_TEMPLATE,
-                                  total_employees=total_employees,
-                                  recent_payroll=recent_payroll,
-                                  employees=employees,
-                                  all_payroll=all_payroll,
-                                  monthly_stats=monthly_stats)
+    # Loaded through the app's Jinja loader, so it is compiled once per process
+    return render_template('dashboard.html',
+                           total_employees=total_employees,
+                           recent_payroll=recent_payroll,
+                           employees=employees,
+                           all_payroll=all_payroll,
+                           monthly_stats=monthly_stats)
 
 
 @app.route('/add_employee', methods=['POST'])
@@ -1625,7 +2975,6 @@ def add_employee():
         ''', (emp_id, name, email, designation, department, joining_date,
               ctc_monthly, ctc_annual, pf_opted))
         conn.commit()
-        conn.close()
 
         flash('Employee added successfully!', 'success')
     except Exception as e:
@@ -1677,50 +3026,29 @@ def bulk_add_employees():
         return redirect(url_for('dashboard'))
 
     try:
-        df = pd.read_excel(file)
+        # The upload is imported by a background job; the dashboard polls it
         conn = get_db_connection()
-
-        success_count = 0
-        error_count = 0
-
-        for _, row in df.iterrows():
-            try:
-                pf_opted = 1 if str(
-                    row['pf_opted']).lower() in ['yes', '1', 'true'] else 0
-                ctc_monthly = float(row['ctc_monthly'])
-                ctc_annual = ctc_monthly * 12
-
-                conn.execute(
-                    '''
-                    INSERT INTO employees (emp_id, name, email, designation, department, 
-                                         joining_date, ctc_monthly, ctc_annual, pf_opted)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (str(row['emp_id']), str(row['name']), str(
-                        row['email']), str(row.get('designation', '')),
-                      str(row.get('department', '')),
-                      str(row.get('joining_date',
-                                  date.today().isoformat())), ctc_monthly,
-                      ctc_annual, pf_opted))
-                success_count += 1
-            except Exception as e:
-                logging.error(
-                    f"Error adding employee {row.get('emp_id', 'Unknown')}: {str(e)}"
-                )
-                error_count += 1
-                continue
-
-        conn.commit()
-        conn.close()
-
-        flash(
-            f'Successfully added {success_count} employees. {error_count} errors.',
-            'success')
+        job_id = enqueue_job(conn, 'bulk_add_employees', path=save_upload(file))
+        flash(str(job_id), 'job')
     except Exception as e:
         flash(f'Error processing file: {str(e)}', 'error')
 
     return redirect(url_for('dashboard'))
 
 
+@app.route('/download_rejects/<filename>')
+def download_rejects(filename):
+    """Download the rejected-rows report of a bulk import"""
+    if not filename.startswith('rejects_'):
+        flash('Rejects report not found!', 'error')
+        return redirect(url_for('dashboard'))
+
+    return send_from_directory(app.config['UPLOAD_FOLDER'],
+                               secure_filename(filename),
+                               mimetype='text/csv',
+                               as_attachment=True)
+
+
 @app.route('/download_payroll_template')
 def download_payroll_template():
     """Generate and download payroll template Excel file"""
@@ -1782,55 +3110,8 @@ def process_individual_payroll():
                     salary_components[key] = round(
                         salary_components[key] * ratio, 2)
 
-        # Check if payroll already exists for this employee/month/year
-        existing = conn.execute(
-            '''
-            SELECT id FROM payroll 
-            WHERE emp_id = ? AND month = ? AND year = ?
-        ''', (emp_id, month, year)).fetchone()
-
-        if existing:
-            # Update existing payroll
-            conn.execute(
-                '''
-                UPDATE payroll SET
-                    days_worked = ?, basic_salary = ?, hra = ?, travel_allowance = ?,
-                    medical_allowance = ?, lta = ?, special_allowance = ?, employer_pf = ?,
-                    employee_pf = ?, pf_deduction = ?, gross_salary = ?, net_salary = ?,
-                    hike_amount = ?, processed_at = CURRENT_TIMESTAMP
-                WHERE emp_id = ? AND month = ? AND year = ?
-            ''', (days_worked, salary_components['basic'],
-                  salary_components['hra'],
-                  salary_components['travel_allowance'],
-                  salary_components['medical_allowance'],
-                  salary_components['lta'],
-                  salary_components['special_allowance'],
-                  salary_components['employer_pf'],
-                  salary_components['employee_pf'],
-                  salary_components['pf_deduction'],
-                  salary_components['gross_salary'],
-                  salary_components['net_salary'], hike_amount, emp_id, month,
-                  year))
-        else:
-            # Insert new payroll
-            conn.execute(
-                '''
-                INSERT INTO payroll (emp_id, month, year, days_worked, basic_salary, hra, 
-                                   travel_allowance, medical_allowance, lta, special_allowance,
-                                   employer_pf, employee_pf, pf_deduction, gross_salary, 
-                                   net_salary, hike_amount)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (emp_id, month, year, days_worked, salary_components['basic'],
-                  salary_components['hra'],
-                  salary_components['travel_allowance'],
-                  salary_components['medical_allowance'],
-                  salary_components['lta'],
-                  salary_components['special_allowance'],
-                  salary_components['employer_pf'],
-                  salary_components['employee_pf'],
-                  salary_components['pf_deduction'],
-                  salary_components['gross_salary'],
-                  salary_components['net_salary'], hike_amount))
+        upsert_payroll(conn, emp_id, month, year, days_worked,
+                       salary_components, hike_amount)
 
         # Update employee CTC if hike was applied
         if hike_amount > 0:
@@ -1842,7 +3123,6 @@ def process_individual_payroll():
             ''', (new_ctc_monthly, new_ctc_annual, emp_id))
 
         conn.commit()
-        conn.close()
 
         flash(f'Payroll processed successfully for {employee["name"]}!',
               'success')
@@ -1867,103 +3147,15 @@ def bulk_process_payroll():
         return redirect(url_for('dashboard'))
 
     try:
-        df = pd.read_excel(file)
-        conn = get_db_connection()
-
-        success_count = 0
-        error_count = 0
-
-        for _, row in df.iterrows():
-            try:
-                emp_id = str(row['emp_id'])
-                days_worked = int(float(row.get('days_worked', 30)))
-                pf_opted = str(row.get('pf_opted',
-                                       'Yes')).lower() in ['yes', '1', 'true']
-
-                # Get employee data
-                employee = conn.execute(
-                    'SELECT * FROM employees WHERE emp_id = ?',
-                    (emp_id, )).fetchone()
-                if not employee:
-                    error_count += 1
-                    continue
-
-                # Calculate salary components
-                salary_components = calculate_salary_components(
-                    employee['ctc_monthly'], pf_opted)
-
-                # Adjust for days worked
-                if days_worked != 30:
-                    ratio = days_worked / 30.0
-                    for key in salary_components:
-                        if key != 'employer_pf':  # Employer PF remains constant
-                            salary_components[key] = round(
-                                salary_components[key] * ratio, 2)
-
-                # Check if payroll already exists
-                existing = conn.execute(
-                    '''
-                    SELECT id FROM payroll 
-                    WHERE emp_id = ? AND month = ? AND year = ?
-                ''', (emp_id, month, year)).fetchone()
-
-                if existing:
-                    # Update existing payroll
-                    conn.execute(
-                        '''
-                        UPDATE payroll SET
-                            days_worked = ?, basic_salary = ?, hra = ?, travel_allowance = ?,
-                            medical_allowance = ?, lta = ?, special_allowance = ?, employer_pf = ?,
-                            employee_pf = ?, pf_deduction = ?, gross_salary = ?, net_salary = ?,
-                            processed_at = CURRENT_TIMESTAMP
-                        WHERE emp_id = ? AND month = ? AND year = ?
-                    ''',
-                        (days_worked, salary_components['basic'],
-                         salary_components['hra'],
-                         salary_components['travel_allowance'],
-                         salary_components['medical_allowance'],
-                         salary_components['lta'],
-                         salary_components['special_allowance'],
-                         salary_components['employer_pf'],
-                         salary_components['employee_pf'],
-                         salary_components['pf_deduction'],
-                         salary_components['gross_salary'],
-                         salary_components['net_salary'], emp_id, month, year))
-                else:
-                    # Insert new payroll
-                    conn.execute(
-                        '''
-                        INSERT INTO payroll (emp_id, month, year, days_worked, basic_salary, hra, 
-                                           travel_allowance, medical_allowance, lta, special_allowance,
-                                           employer_pf, employee_pf, pf_deduction, gross_salary, 
-                                           net_salary, hike_amount)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (emp_id, month, year, days_worked,
-                          salary_components['basic'], salary_components['hra'],
-                          salary_components['travel_allowance'],
-                          salary_components['medical_allowance'],
-                          salary_components['lta'],
-                          salary_components['special_allowance'],
-                          salary_components['employer_pf'],
-                          salary_components['employee_pf'],
-                          salary_components['pf_deduction'],
-                          salary_components['gross_salary'],
-                          salary_components['net_salary'], 0))
-
-                success_count += 1
-            except Exception as e:
-                logging.error(
-                    f"Error processing payroll for {row.get('emp_id', 'Unknown')}: {str(e)}"
-                )
-                error_count += 1
-                continue
-
-        conn.commit()
-        conn.close()
+        payroll_period(month, year)
 
-        flash(
-            f'Successfully processed {success_count} payrolls. {error_count} errors.',
-            'success')
+        conn = get_db_connection()
+        job_id = enqueue_job(conn,
+                             'bulk_process_payroll',
+                             path=save_upload(file),
+                             month=month,
+                             year=year)
+        flash(str(job_id), 'job')
     except Exception as e:
         flash(f'Error processing file: {str(e)}', 'error')
 
@@ -1996,7 +3188,6 @@ def apply_hike():
         ''', (new_ctc_monthly, new_ctc_annual, emp_id))
 
         conn.commit()
-        conn.close()
 
         flash(
             f'Salary hike of ₹{hike_amount:,.2f} applied successfully for {employee["name"]}!',
@@ -2013,60 +3204,291 @@ def send_payslips():
         month = request.form['month']
         year = int(request.form['year'])
 
+        config_error = mail_config_error(app.config)
+        if config_error:
+            flash(config_error, 'error')
+            return redirect(url_for('dashboard'))
+
         conn = get_db_connection()
 
-        # Get all payroll records for the specified month/year
-        payroll_records = conn.execute(
-            '''
-            SELECT p.*, e.name, e.email, e.designation, e.department
-            FROM payroll p 
-            JOIN employees e ON p.emp_id = e.emp_id 
-            WHERE p.month = ? AND p.year = ?
-        ''', (month, year)).fetchall()
+        payroll_exists = conn.execute(
+            'SELECT 1 FROM payroll WHERE period = ? LIMIT 1',
+            (payroll_period(month, year), )).fetchone()
 
-        if not payroll_records:
+        if not payroll_exists:
             flash(f'No payroll records found for {month} {year}!', 'error')
             return redirect(url_for('dashboard'))
 
-        success_count = 0
-        error_count = 0
+        # Rendering and mailing run in a background job, so large mailings
+        # are not cut short by the request timeout. A send already under way
+        # for the month is reported instead of starting a second one
+        job_id = enqueue_period_job(conn, 'send_payslips', month, year)
+        flash(str(job_id), 'job')
+    except Exception as e:
+        flash(f'Error sending payslips: {str(e)}', 'error')
+
+    return redirect(url_for('dashboard'))
 
-        for record in payroll_records:
-            try:
-                # Generate payslip PDF
-                employee_data = {
-                    'emp_id': record['emp_id'],
-                    'name': record['name'],
-                    'designation': record['designation'],
-                    'department': record['department']
-                }
-
-                payslip_pdf = generate_payslip_pdf(employee_data, record)
-
-                # Send email
-                if send_payslip_email(record['email'], record['name'],
-                                      payslip_pdf, month, year):
-                    success_count += 1
-                else:
-                    error_count += 1
 
-            except Exception as e:
-                logging.error(
-                    f"Error sending payslip to {record['name']}: {str(e)}")
-                error_count += 1
-                continue
+@app.route('/resend_failed_payslips', methods=['POST'])
+def resend_failed_payslips():
+    try:
+        month = request.form['month']
+        year = int(request.form['year'])
 
-        conn.close()
+        config_error = mail_config_error(app.config)
+        if config_error:
+            flash(config_error, 'error')
+            return redirect(url_for('dashboard'))
 
-        flash(
-            f'Payslips sent successfully to {success_count} employees. {error_count} failed.',
-            'success')
+        conn = get_db_connection()
+
+        failed_count = conn.execute(
+            '''
+            SELECT COUNT(*) FROM payslip_outbox
+            WHERE period = ? AND status = 'failed'
+        ''', (payroll_period(month, year), )).fetchone()[0]
+
+        if not failed_count:
+            flash(f'No failed payslips to resend for {month} {year}!', 'error')
+            return redirect(url_for('dashboard'))
+
+        job_id = enqueue_period_job(conn,
+                                    'send_payslips',
+                                    month,
+                                    year,
+                                    failed_only=True)
+        flash(str(job_id), 'job')
     except Exception as e:
-        flash(f'Error sending payslips: {str(e)}', 'error')
+        flash(f'Error resending payslips: {str(e)}', 'error')
 
     return redirect(url_for('dashboard'))
 
 
+@app.route('/api/jobs/<int:job_id>')
+def api_job(job_id):
+    """Status of a background job with its done, failed and remaining counts"""
+    try:
+        conn = get_db_connection()
+        job = conn.execute(
+            '''
+            SELECT *, (julianday(COALESCE(finished_at, CURRENT_TIMESTAMP)) -
+                       julianday(started_at)) * 86400 AS elapsed_seconds
+            FROM jobs WHERE id = ?
+        ''', (job_id, )).fetchone()
+
+        if not job:
+            return jsonify({'success': False, 'message': 'Job not found'}), 404
+
+        result = json.loads(job['result']) if job['result'] else None
+        if result and result.get('rejects_file'):
+            result['rejects_url'] = url_for('download_rejects',
+                                            filename=result['rejects_file'])
+
+        remaining = None
+        if job['total'] is not None:
+            remaining = max(job['total'] - job['done'] - job['failed'], 0)
+
+        # Items finished per second since the job started
+        throughput = None
+        if job['elapsed_seconds']:
+            throughput = round(
+                (job['done'] + job['failed']) / job['elapsed_seconds'], 2)
+
+        return jsonify({
+            'success': True,
+            'job': {
+                'id': job['id'],
+                'kind': job['kind'],
+                'status': job['status'],
+                'total': job['total'],
+                'done': job['done'],
+                'failed': job['failed'],
+                'remaining': remaining,
+                'elapsed_seconds': job['elapsed_seconds'],
+                'throughput': throughput,
+                'result': result,
+                'error': job['error'],
+                'created_at': job['created_at'],
+                'started_at': job['started_at'],
+                'finished_at': job['finished_at']
+            }
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+
+EMPLOYEE_PAGE_SIZE = 25
+MAX_EMPLOYEE_PAGE_SIZE = 200
+
+
+def encode_cursor(values):
+    """Opaque keyset-pagination cursor for the last row of a page"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor):
+    return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+
+
+def page_limit(default, maximum):
+    """The limit= query argument clamped to 1..maximum.
+
+    Returns None when it is not an integer, so the caller can answer 400.
+    """
+    try:
+        limit = int(request.args.get('limit', default))
+    except ValueError:
+        return None
+    return max(1, min(limit, maximum))
+
+
+@app.route('/api/employees')
+def api_employees():
+    """API endpoint to page through employees, optionally by ID or name prefix.
+
+    format=columnar returns the page column by column; format=ndjson streams
+    every match from the after= cursor on, one employee per line.
+    """
+    try:
+        shape = response_format()
+        search = request.args.get('q', '').strip()
+        after = request.args.get('after')
+        limit = page_limit(EMPLOYEE_PAGE_SIZE, MAX_EMPLOYEE_PAGE_SIZE)
+        if limit is None:
+            return jsonify({
+                'success': False,
+                'message': 'limit must be an integer'
+            }), 400
+
+        conn = get_db_connection()
+
+        query = '''
+            SELECT emp_id, name, email, designation, department, ctc_monthly,
+                   pf_opted, joining_date
+            FROM employees
+        '''
+
+        params = []
+        conditions = []
+
+        if search:
+            # Prefix ranges instead of LIKE so both NOCASE indexes can be used
+            upper_bound = search + '\U0010ffff'
+            conditions.append(
+                '((name >= ? COLLATE NOCASE AND name < ? COLLATE NOCASE) OR '
+                '(emp_id >= ? COLLATE NOCASE AND emp_id < ? COLLATE NOCASE))')
+            params.extend([search, upper_bound, search, upper_bound])
+
+        if after:
+            last_name, last_emp_id = decode_cursor(after)
+            conditions.append(
+                '(name > ? COLLATE NOCASE OR '
+                '(name = ? COLLATE NOCASE AND emp_id > ?))')
+            params.extend([last_name, last_name, last_emp_id])
+
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+
+        query += ' ORDER BY name COLLATE NOCASE, emp_id'
+        cursor = tuple_cursor(conn)
+
+        if shape == 'ndjson':
+            return ndjson_response(cursor.execute(query, params))
+
+        # One extra row tells us whether there is a next page
+        query += ' LIMIT ?'
+        params.append(limit + 1)
+
+        rows = cursor.execute(query, params).fetchall()
+        columns = cursor_columns(cursor)
+
+        next_cursor = None
+        if len(rows) > limit:
+            # emp_id and name are the first two columns
+            emp_id, name = rows[limit - 1][:2]
+            next_cursor = encode_cursor([name, emp_id])
+
+        return jsonify({
+            'success': True,
+            'employees': serialize_rows(columns, rows[:limit], shape),
+            'next_cursor': next_cursor
+        })
+
+    except Exception as e:
+        logging.error(f"Error fetching employees: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)})
+
+
+# Response shapes for API row listings: rows (a list of objects), columnar
+# (column names once, then one array of values per column) or ndjson (one
+# object per line, streamed)
+RESPONSE_FORMATS = ('rows', 'columnar', 'ndjson')
+NDJSON_FETCH_ROWS = 1000
+
+
+def response_format():
+    """The format= query argument, checked against RESPONSE_FORMATS"""
+    value = request.args.get('format', 'rows')
+    if value not in RESPONSE_FORMATS:
+        raise ValueError(f'Unsupported format: {value}')
+    return value
+
+
+def serialize_rows(columns, rows, shape='rows'):
+    """JSON-ready form of tuple rows for the given column names.
+
+    Rows may carry extra trailing values beyond columns, which are dropped.
+    columnar gives {'columns': [...], 'data': [[...], ...]} with one array
+    per column, so key names are not repeated on every row.
+    """
+    if shape == 'columnar':
+        data = [list(values) for values in zip(*rows)][:len(columns)]
+        return {'columns': columns, 'data': data or [[] for _ in columns]}
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def iter_ndjson(cursor, columns=None):
+    """Yield the cursor's rows as newline-delimited JSON objects in batches"""
+    columns = columns or cursor_columns(cursor)
+    encode = json.JSONEncoder(ensure_ascii=False,
+                              separators=(',', ':')).encode
+    while True:
+        rows = cursor.fetchmany(NDJSON_FETCH_ROWS)
+        if not rows:
+            break
+        yield ''.join(f'{encode(dict(zip(columns, row)))}\n' for row in rows)
+
+
+def ndjson_response(cursor, columns=None):
+    """Streamed application/x-ndjson response over a tuple cursor"""
+    return Response(stream_with_context(iter_ndjson(cursor, columns)),
+                    mimetype='application/x-ndjson')
+
+
+def conditional_json(etag, build):
+    """JSON response for a request that may already hold the current version.
+
+    etag identifies the data; when it matches If-None-Match a bodiless 304
+    is returned and build() is never called, otherwise build() supplies the
+    JSON payload. Both carry the ETag and API_CACHE_CONTROL.
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = app.config['API_CACHE_CONTROL']
+    return response
+
+
+def row_etag(*values):
+    """Short, stable ETag for a tuple of values"""
+    return hashlib.sha1(json.dumps(values,
+                                   default=str).encode()).hexdigest()[:32]
+
+
 @app.route('/api/payslip/<emp_id>/<month>/<int:year>')
 def api_payslip(emp_id, month, year):
     """API endpoint to get payslip data as HTML"""
@@ -2079,8 +3501,8 @@ def api_payslip(emp_id, month, year):
             SELECT p.*, e.name, e.designation, e.department, e.email
             FROM payroll p 
             JOIN employees e ON p.emp_id = e.emp_id 
-            WHERE p.emp_id = ? AND p.month = ? AND p.year = ?
-        ''', (emp_id, month, year)).fetchone()
+            WHERE p.period = ? AND p.emp_id = ?
+        ''', (payroll_period(month, year), emp_id)).fetchone()
 
         if not payroll:
             return jsonify({
@@ -2088,8 +3510,21 @@ def api_payslip(emp_id, month, year):
                 'message': 'Payroll record not found'
             })
 
-        # Generate HTML payslip
-        payslip_html = f"""
+        # processed_at changes on every upsert, and the employee columns
+        # cover edits to the employee record
+        etag = row_etag(*payroll)
+        return conditional_json(
+            etag, lambda: payslip_json(payroll, emp_id, month, year))
+
+    except Exception as e:
+        logging.error(f"Error generating payslip HTML: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)})
+
+
+def payslip_json(payroll, emp_id, month, year):
+    """Payslip modal payload: the rendered HTML and its identifiers"""
+    # Generate HTML payslip
+    payslip_html = f"""
         <div class="payslip-container" style="max-width: 800px; margin: 0 auto; font-family: Arial, sans-serif;">
             <div class="payslip-header" style="text-align: center; margin-bottom: 30px; padding: 20px; background: linear-gradient(135deg, #2c3e50 0%, #3498db 100%); color: white; border-radius: 8px;">
                 <h2 style="margin: 0; font-size: 2rem;">PAYSLIP</h2>
@@ -2146,99 +3581,241 @@ def api_payslip(emp_id, month, year):
         </div>
         """
 
-        conn.close()
+    return {
+        'success': True,
+        'html': payslip_html,
+        'emp_id': emp_id,
+        'month': month,
+        'year': year
+    }
 
-        return jsonify({
-            'success': True,
-            'html': payslip_html,
-            'emp_id': emp_id,
-            'month': month,
-            'year': year
-        })
 
-    except Exception as e:
-        logging.error(f"Error generating payslip HTML: {str(e)}")
-        return jsonify({'success': False, 'message': str(e)})
+PAYROLL_PAGE_SIZE = 50
+MAX_PAYROLL_PAGE_SIZE = 1000
+
+# Fields /api/payrolls can return, with the column each is read from
+PAYROLL_API_FIELDS = {
+    'emp_id': 'p.emp_id',
+    'name': 'e.name',
+    'department': 'e.department',
+    'month': 'p.month',
+    'year': 'p.year',
+    'period': 'p.period',
+    'days_worked': 'p.days_worked',
+    'gross_salary': 'p.gross_salary',
+    'net_salary': 'p.net_salary',
+    'basic_salary': 'p.basic_salary',
+    'hra': 'p.hra',
+    'travel_allowance': 'p.travel_allowance',
+    'medical_allowance': 'p.medical_allowance',
+    'lta': 'p.lta',
+    'special_allowance': 'p.special_allowance',
+    'pf_deduction': 'p.pf_deduction',
+    'hike_amount': 'p.hike_amount',
+}
 
 
 @app.route('/api/payrolls')
 def api_payrolls():
-    """API endpoint to get filtered payroll records"""
+    """API endpoint to page through filtered payroll records.
+
+    Newest period first, then by employee ID. Filters: month, year, from/to
+    (yyyymm or yyyy-mm), emp_id, department and min_salary/max_salary on
+    net salary. fields= picks a comma-separated subset of PAYROLL_API_FIELDS,
+    limit sets the page size and after= takes the previous page's
+    next_cursor. format=columnar returns the page column by column;
+    format=ndjson streams every match from the cursor on, one per line.
+    """
     try:
+        shape = response_format()
         month = request.args.get('month')
         year = request.args.get('year')
+        period_from = request.args.get('from')
+        period_to = request.args.get('to')
+        emp_id = request.args.get('emp_id')
+        department = request.args.get('department')
+        min_salary = request.args.get('min_salary', type=float)
+        max_salary = request.args.get('max_salary', type=float)
+        after = request.args.get('after')
+        limit = page_limit(PAYROLL_PAGE_SIZE, MAX_PAYROLL_PAGE_SIZE)
+        if limit is None:
+            return jsonify({
+                'success': False,
+                'message': 'limit must be an integer'
+            }), 400
+
+        fields = list(PAYROLL_API_FIELDS)
+        if request.args.get('fields'):
+            # Repeated names are returned once, in first-mention order
+            fields = list(
+                dict.fromkeys(field.strip()
+                              for field in request.args['fields'].split(',')))
+            unknown = [f for f in fields if f not in PAYROLL_API_FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
 
         conn = get_db_connection()
 
-        query = '''
-            SELECT p.*, e.name 
-            FROM payroll p 
-            JOIN employees e ON p.emp_id = e.emp_id 
+        # The cursor needs period and emp_id even when they are not returned
+        selected = dict.fromkeys(fields + ['period', 'emp_id'])
+        query = f'''
+            SELECT {', '.join(f'{PAYROLL_API_FIELDS[f]} AS {f}' for f in selected)}
+            FROM payroll p
+            JOIN employees e ON p.emp_id = e.emp_id
         '''
 
         params = []
         conditions = []
 
-        if month:
+        if month and year:
+            conditions.append('p.period = ?')
+            params.append(payroll_period(month, year))
+        elif month:
             conditions.append('p.month = ?')
             params.append(month)
+        elif year:
+            conditions.append('p.period BETWEEN ? AND ?')
+            params.extend([int(year) * 100 + 1, int(year) * 100 + 12])
 
-        if year:
-            conditions.append('p.year = ?')
-            params.append(int(year))
+        # Inclusive period range, given as yyyymm or yyyy-mm
+        if period_from:
+            conditions.append('p.period >= ?')
+            params.append(parse_period(period_from))
+
+        if period_to:
+            conditions.append('p.period <= ?')
+            params.append(parse_period(period_to))
+
+        if emp_id:
+            conditions.append('p.emp_id = ?')
+            params.append(emp_id)
+
+        if department:
+            conditions.append('e.department = ?')
+            params.append(department)
+
+        if min_salary is not None:
+            conditions.append('p.net_salary >= ?')
+            params.append(min_salary)
+
+        if max_salary is not None:
+            conditions.append('p.net_salary <= ?')
+            params.append(max_salary)
+
+        if after:
+            # Row value comparison so the index seeks straight to the page
+            last_period, last_emp_id = decode_cursor(after)
+            conditions.append('(p.period, p.emp_id) < (?, ?)')
+            params.extend([last_period, last_emp_id])
 
         if conditions:
             query += ' WHERE ' + ' AND '.join(conditions)
 
-        query += ' ORDER BY p.processed_at DESC LIMIT 50'
-
-        payrolls = conn.execute(query, params).fetchall()
-
-        # Convert to list of dictionaries
-        payroll_list = []
-        for payroll in payrolls:
-            payroll_list.append({
-                'emp_id':
-                payroll['emp_id'],
-                'name':
-                payroll['name'],
-                'month':
-                payroll['month'],
-                'year':
-                payroll['year'],
-                'days_worked':
-                payroll['days_worked'],
-                'gross_salary':
-                payroll['gross_salary'],
-                'net_salary':
-                payroll['net_salary'],
-                'basic_salary':
-                payroll['basic_salary'],
-                'hra':
-                payroll['hra'],
-                'travel_allowance':
-                payroll['travel_allowance'],
-                'medical_allowance':
-                payroll['medical_allowance'],
-                'lta':
-                payroll['lta'],
-                'special_allowance':
-                payroll['special_allowance'],
-                'pf_deduction':
-                payroll['pf_deduction'],
-                'hike_amount':
-                payroll['hike_amount']
-            })
+        query += ' ORDER BY p.period DESC, p.emp_id DESC'
+
+        if shape == 'ndjson':
+            return ndjson_response(
+                tuple_cursor(conn).execute(query, params), fields)
 
-        conn.close()
+        # One extra row tells us whether there is a next page
+        query += ' LIMIT ?'
+        params.append(limit + 1)
 
-        return jsonify({'success': True, 'payrolls': payroll_list})
+        # Any payroll or employee write bumps a revision, so together with
+        # the query they identify the result without running it
+        revisions = tuple(
+            conn.execute('''
+                SELECT (SELECT revision FROM payroll_revision WHERE id = 1),
+                       (SELECT revision FROM employees_revision WHERE id = 1)
+            ''').fetchone())
+        etag = row_etag(revisions, shape, query, params)
+
+        return conditional_json(
+            etag,
+            lambda: payrolls_json(conn, query, params, list(selected), fields,
+                                  limit, shape))
 
     except Exception as e:
         logging.error(f"Error fetching payrolls: {str(e)}")
         return jsonify({'success': False, 'message': str(e)})
 
 
+def payrolls_json(conn, query, params, selected, fields, limit, shape):
+    """Run the payroll listing query and build its JSON payload.
+
+    selected names the query's columns: the requested fields first, then
+    any cursor keys that were not requested.
+    """
+    rows = tuple_cursor(conn).execute(query, params).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor([
+            last[selected.index('period')], last[selected.index('emp_id')]
+        ])
+
+    return {
+        'success': True,
+        'payrolls': serialize_rows(fields, rows[:limit], shape),
+        'next_cursor': next_cursor
+    }
+
+
+@app.route('/api/payrolls/export')
+def api_payrolls_export():
+    """Export payroll history for a period range as Parquet or Arrow IPC.
+
+    Takes from and to as yyyymm or yyyy-mm and format=parquet|arrow. With
+    partition_by=year the files come as a ZIP with one year=YYYY directory
+    per year.
+    """
+    try:
+        export_format = request.args.get('format', 'parquet')
+        if export_format not in PAYROLL_EXPORT_FORMATS:
+            raise ValueError(f'Unsupported export format: {export_format}')
+        period_from = parse_period(request.args['from'])
+        period_to = parse_period(request.args['to'])
+        partition_by = request.args.get('partition_by') or None
+        import_pyarrow()
+
+        conn = get_db_connection()
+        partitions = payroll_export_partitions(conn, period_from, period_to,
+                                               partition_by)
+        name = f"payroll_{request.args['from']}_{request.args['to']}"
+
+        if partition_by:
+            return Response(
+                stream_with_context(
+                    iter_payroll_export_zip(conn, partitions, export_format)),
+                mimetype='application/zip',
+                headers={
+                    'Content-Disposition':
+                    f'attachment; filename="{name}.zip"'
+                })
+
+        # Written to a temporary file so large exports stay off the heap
+        output = tempfile.TemporaryFile()
+        write_payroll_export(conn, output, export_format, period_from,
+                             period_to)
+        output.seek(0)
+        return send_file(
+            output,
+            mimetype='application/vnd.apache.parquet' if export_format
+            == 'parquet' else 'application/vnd.apache.arrow.file',
+            as_attachment=True,
+            download_name=f'{name}.{export_format}')
+
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'message': f'Missing parameter: {e.args[0]}'
+        })
+    except Exception as e:
+        logging.error(f"Error exporting payroll: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)})
+
+
 @app.route('/download_payslip/<emp_id>/<month>/<int:year>')
 def download_payslip(emp_id, month, year):
     """Download payslip as PDF"""
@@ -2251,19 +3828,17 @@ def download_payslip(emp_id, month, year):
         payroll = conn.execute(
             '''
             SELECT * FROM payroll 
-            WHERE emp_id = ? AND month = ? AND year = ?
-        ''', (emp_id, month, year)).fetchone()
+            WHERE period = ? AND emp_id = ?
+        ''', (payroll_period(month, year), emp_id)).fetchone()
 
         if not employee or not payroll:
             flash('Employee or payroll record not found!', 'error')
             return redirect(url_for('dashboard'))
 
-        # Generate PDF
-        payslip_pdf = generate_payslip_pdf(employee, payroll)
-
-        conn.close()
+        # Served from the payslip cache, rendering it first on a miss
+        payslip_path = cached_payslip_pdf(employee, payroll)
 
-        return send_file(payslip_pdf,
+        return send_file(os.path.abspath(payslip_path),
                          mimetype='application/pdf',
                          as_attachment=True,
                          download_name=f'payslip_{emp_id}_{month}_{year}.pdf')
@@ -2273,85 +3848,117 @@ def download_payslip(emp_id, month, year):
         return redirect(url_for('dashboard'))
 
 
-@app.route('/download_report/<month>/<int:year>')
-def download_report(month, year):
-    """Download complete payroll report for selected month/year as Excel"""
+@app.route('/download_payslips/<month>/<int:year>.zip')
+def download_payslips(month, year):
+    """Download every payslip for a month as a streamed ZIP archive"""
+    try:
+        conn = get_db_connection()
+
+        payroll_records = conn.execute(
+            '''
+            SELECT p.*, e.name, e.email, e.designation, e.department
+            FROM payroll p
+            JOIN employees e ON p.emp_id = e.emp_id
+            WHERE p.period = ?
+            ORDER BY p.emp_id
+        ''', (payroll_period(month, year), )).fetchall()
+
+        if not payroll_records:
+            flash(f'No payroll records found for {month} {year}!', 'error')
+            return redirect(url_for('dashboard'))
+
+        records = [dict(record) for record in payroll_records]
+        return Response(
+            stream_with_context(iter_payslip_zip(records, month, year)),
+            mimetype='application/zip',
+            headers={
+                'Content-Disposition':
+                f'attachment; filename="payslips_{month}_{year}.zip"'
+            })
+
+    except Exception as e:
+        flash(f'Error generating payslips: {str(e)}', 'error')
+        return redirect(url_for('dashboard'))
+
+
+@app.route('/download_payslip_register/<month>/<int:year>')
+def download_payslip_register(month, year):
+    """Download every payslip for a month as one merged PDF register"""
     try:
         conn = get_db_connection()
 
-        # Get all payroll records for the month/year
+        # The payroll report's rows, streamed from the cursor page by page
         payrolls = conn.execute(
             '''
             SELECT p.*, e.name, e.email, e.designation, e.department
-            FROM payroll p 
-            JOIN employees e ON p.emp_id = e.emp_id 
-            WHERE p.month = ? AND p.year = ?
+            FROM payroll p
+            JOIN employees e ON p.emp_id = e.emp_id
+            WHERE p.period = ?
             ORDER BY e.name
-        ''', (month, year)).fetchall()
+        ''', (payroll_period(month, year), ))
+
+        # Written to a temporary file so large registers stay off the heap
+        output = tempfile.TemporaryFile()
+        pages = write_payslip_register(output, payrolls,
+                                       f'Payslip Register {month} {year}')
 
-        if not payrolls:
+        if not pages:
+            output.close()
             flash(f'No payroll records found for {month} {year}!', 'error')
             return redirect(url_for('dashboard'))
 
-        # Create Excel workbook
-        import pandas as pd
-        from io import BytesIO
-
-        # Convert payroll data to list of dictionaries
-        data = []
-        for payroll in payrolls:
-            data.append({
-                'Employee ID': payroll['emp_id'],
-                'Name': payroll['name'],
-                'Email': payroll['email'],
-                'Designation': payroll['designation'] or 'N/A',
-                'Department': payroll['department'] or 'N/A',
-                'Month': payroll['month'],
-                'Year': payroll['year'],
-                'Days Worked': payroll['days_worked'],
-                'Basic Salary': payroll['basic_salary'],
-                'HRA': payroll['hra'],
-                'Travel Allowance': payroll['travel_allowance'],
-                'Medical Allowance': payroll['medical_allowance'],
-                'LTA': payroll['lta'],
-                'Special Allowance': payroll['special_allowance'],
-                'Gross Salary': payroll['gross_salary'],
-                'PF Deduction': payroll['pf_deduction'],
-                'Net Salary': payroll['net_salary'],
-                'Hike Amount': payroll['hike_amount'],
-                'Processed Date': payroll['processed_at']
-            })
+        output.seek(0)
+        return send_file(
+            output,
+            mimetype='application/pdf',
+            as_attachment=True,
+            download_name=f'payslip_register_{month}_{year}.pdf')
 
-        # Create DataFrame
-        df = pd.DataFrame(data)
-
-        # Create Excel file in memory
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer,
-                        sheet_name=f'{month}_{year}_Payroll',
-                        index=False)
-
-            # Add summary sheet
-            summary_data = {
-                'Metric': [
-                    'Total Employees', 'Total Gross Salary',
-                    'Total PF Deduction', 'Total Net Salary',
-                    'Average Gross Salary', 'Average Net Salary'
-                ],
-                'Value': [
-                    len(payrolls), f"₹{df['Gross Salary'].sum():.2f}",
-                    f"₹{df['PF Deduction'].sum():.2f}",
-                    f"₹{df['Net Salary'].sum():.2f}",
-                    f"₹{df['Gross Salary'].mean():.2f}",
-                    f"₹{df['Net Salary'].mean():.2f}"
-                ]
-            }
-            summary_df = pd.DataFrame(summary_data)
-            summary_df.to_excel(writer, sheet_name='Summary', index=False)
+    except Exception as e:
+        logging.error(f"Error generating payslip register: {str(e)}")
+        flash(f'Error generating payslip register: {str(e)}', 'error')
+        return redirect(url_for('dashboard'))
+
+
+@app.route('/download_report/<month>/<int:year>')
+def download_report(month, year):
+    """Download complete payroll report for selected month/year.
+
+    Excel by default, or CSV with ?format=csv. Rows are streamed from the
+    cursor rather than loaded into memory.
+    """
+    try:
+        conn = get_db_connection()
+        period = payroll_period(month, year)
+
+        # Totals come from the period's summary row, kept by triggers
+        summary = conn.execute(
+            '''
+            SELECT payroll_count, total_gross, total_net, total_pf
+            FROM payroll_monthly_summary
+            WHERE period = ?
+        ''', (period, )).fetchone()
+
+        if not summary or not summary['payroll_count']:
+            flash(f'No payroll records found for {month} {year}!', 'error')
+            return redirect(url_for('dashboard'))
+
+        rows = payroll_report_cursor(conn, period)
+
+        if request.args.get('format') == 'csv':
+            return Response(
+                stream_with_context(iter_payroll_report_csv(rows)),
+                mimetype='text/csv',
+                headers={
+                    'Content-Disposition':
+                    f'attachment; filename="payroll_report_{month}_{year}.csv"'
+                })
 
+        # Written to a temporary file so large reports stay off the heap
+        output = tempfile.TemporaryFile()
+        write_payroll_report_xlsx(output, rows, f'{month}_{year}_Payroll',
+                                  payroll_report_summary(summary))
         output.seek(0)
-        conn.close()
 
         return send_file(
             output,
@@ -0,0 +1,180 @@
+"""Benchmark payslip distribution end to end against a local SMTP sink.
+
+Seeds a throwaway database with a synthetic workforce and a month of
+payroll, starts an SMTP stand-in on localhost and drives the real
+/send_payslips path: the route queues the job, which is then run here
+through the outbox dispatcher, render pool and pooled SMTP sessions. No
+mail leaves the machine.
+
+Reports payslips per second, the time spent waiting for PDFs, building
+MIME messages and in SMTP (the last two summed over sender threads), and
+peak memory: resident size of this process and of the largest render
+worker, plus the Python heap with --trace-memory.
+
+    python benchmarks/bench_payslip_distribution.py --employees 2000 \\
+        --sessions 4 --render-workers 2 --latency-ms 20
+"""
+import argparse
+import os
+import resource
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep the benchmark away from the real payroll.db and payslip cache, and run
+# the job in this process rather than on a background worker thread
+WORK_DIR = os.environ.setdefault('BENCH_WORK_DIR', tempfile.mkdtemp())
+os.environ.setdefault('DATABASE_PATH', os.path.join(WORK_DIR, 'bench.db'))
+os.environ.setdefault('PAYSLIP_CACHE_DIR',
+                      os.path.join(WORK_DIR, 'payslip_cache'))
+os.environ['JOB_WORKERS'] = '0'
+
+import pandas as pd  # noqa: E402
+
+import app as payroll_app  # noqa: E402
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept messages, without TLS or AUTH"""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.reply('220 bench sink')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO', 'MAIL', 'RCPT', 'RSET',
+                                   'NOOP')):
+                self.reply('250 OK')
+            elif command == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                # Stand-in for the provider's round trip
+                time.sleep(self.server.latency)
+                with self.server.lock:
+                    self.server.messages += 1
+                self.reply('250 Queued')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency):
+        super().__init__(('127.0.0.1', 0), SMTPSinkHandler)
+        self.latency = latency
+        self.messages = 0
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+
+def seed(conn, employees, month, year):
+    """Synthetic employees and their payroll, through the real bulk path"""
+    with conn:
+        conn.executemany(
+            '''
+            INSERT INTO employees (emp_id, name, email, designation, department,
+                                   joining_date, ctc_monthly, ctc_annual, pf_opted)
+            VALUES (?, ?, ?, 'Engineer', ?, '2024-01-01', ?, ?, ?)
+        ''', [(f'BENCH{i:06d}', f'Employee {i}', f'employee{i}@example.com',
+               ('IT', 'HR', 'Finance', 'Sales')[i % 4], 30000 + i % 5000 * 10,
+               (30000 + i % 5000 * 10) * 12, i % 3 != 0)
+              for i in range(employees)])
+
+    frame = pd.DataFrame({
+        'emp_id': [f'BENCH{i:06d}' for i in range(employees)],
+        'days_worked': [30] * employees
+    })
+    payroll_app.process_payroll_frame(conn, frame, month, year)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--employees', type=int, default=1000)
+    parser.add_argument('--sessions', type=int, default=4)
+    parser.add_argument('--render-workers',
+                        type=int,
+                        default=os.cpu_count() or 1)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--rate-per-minute', type=float, default=0)
+    parser.add_argument('--trace-memory',
+                        action='store_true',
+                        help='also report the peak Python heap via tracemalloc '
+                        '(slows the run down considerably)')
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.latency_ms / 1000)
+    app = payroll_app.app
+    app.config.update(MAIL_SERVER='127.0.0.1',
+                      MAIL_PORT=sink.server_address[1],
+                      MAIL_USE_TLS=False,
+                      MAIL_USE_AUTH=False,
+                      MAIL_USERNAME='',
+                      MAIL_PASSWORD='',
+                      MAIL_SENDER='payroll@example.com',
+                      MAIL_SESSIONS=args.sessions,
+                      MAIL_RATE_PER_MINUTE=args.rate_per_minute,
+                      PAYSLIP_RENDER_WORKERS=args.render_workers)
+
+    month, year = 'January', 2024
+    conn = payroll_app.get_db_connection()
+    seed(conn, args.employees, month, year)
+
+    client = app.test_client()
+    client.post('/send_payslips', data={'month': month, 'year': year})
+
+    if args.trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    job = payroll_app.claim_job(conn)
+    payroll_app.run_job(job)
+    elapsed = time.perf_counter() - start
+    if args.trace_memory:
+        _, peak_traced = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    status = client.get(f"/api/jobs/{job['id']}").get_json()['job']
+    timings = (status['result'] or {}).get('timings', {})
+    # RUSAGE_CHILDREN only covers children that have exited and been reaped;
+    # the render pool is shut down, and its workers joined, when the job's
+    # batch finishes
+    # ru_maxrss is in KiB on Linux; for children it is the largest one
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    peak_children = resource.getrusage(
+        resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+    print(f"employees={args.employees} sessions={args.sessions} "
+          f"render_workers={args.render_workers} latency={args.latency_ms}ms "
+          f"rate_limit={args.rate_per_minute or 'none'}")
+    print(f"job status:        {status['status']} ({status['done']} sent, "
+          f"{status['failed']} failed, {sink.messages} received by sink)")
+    print(f"wall time:         {elapsed:8.2f} s")
+    print(f"throughput:        {status['done'] / elapsed:8.1f} payslips/s")
+    for stage in ('pdf', 'mime', 'smtp'):
+        seconds = timings.get(f'{stage}_seconds', 0)
+        print(f"{stage + ' time:':<19}{seconds:8.2f} s "
+              f"({seconds / max(status['done'], 1) * 1000:.2f} ms/payslip)")
+    if args.trace_memory:
+        print(f"peak traced heap:  {peak_traced / 1024 / 1024:8.1f} MB")
+    print(f"peak RSS:          {peak_rss:8.1f} MB "
+          f"(largest render worker {peak_children:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark payslip PDF rendering in payslips per second on one core.
+
+Compares the platypus flow as it used to run (styles rebuilt on every call),
+the platypus flow with the cached styles, and the canvas renderer that
+generate_payslip_pdf now uses. Everything runs in this one process, so the
+figures are per core; multiply by PAYSLIP_RENDER_WORKERS for a bulk send.
+
+    python benchmarks/bench_payslip_render.py --runs 500
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep the benchmark away from the real payroll.db
+os.environ.setdefault('DATABASE_PATH',
+                      os.path.join(tempfile.mkdtemp(), 'bench.db'))
+
+from app import (calculate_salary_components, generate_payslip_pdf,  # noqa: E402
+                 generate_payslip_pdf_platypus, payslip_styles)
+
+
+def sample_records(count):
+    records = []
+    for i in range(count):
+        record = {
+            'emp_id': f'EMP{i:05d}',
+            'name': f'Employee {i}',
+            'designation': 'Developer',
+            'department': 'IT' if i % 3 else None,
+            'month': 'January',
+            'year': 2024,
+            'days_worked': 30
+        }
+        components = calculate_salary_components(30000 + i * 37)
+        components['basic_salary'] = components.pop('basic')
+        record.update(components)
+        records.append(record)
+    return records
+
+
+def payslips_per_second(render, records):
+    render(records[0], records[0])  # warm-up: fonts, caches, imports
+    start = time.perf_counter()
+    for record in records:
+        render(record, record)
+    return len(records) / (time.perf_counter() - start)
+
+
+def render_uncached(employee_data, payroll_data):
+    # The previous behaviour: styles built from scratch for every payslip
+    payslip_styles.cache_clear()
+    return generate_payslip_pdf_platypus(employee_data, payroll_data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=500)
+    args = parser.parse_args()
+
+    records = sample_records(args.runs)
+
+    before = payslips_per_second(render_uncached, records)
+    cached = payslips_per_second(generate_payslip_pdf_platypus, records)
+    after = payslips_per_second(generate_payslip_pdf, records)
+
+    print(f"runs={args.runs}")
+    print(f"platypus, styles per call (previous): {before:8.1f} payslips/s")
+    print(f"platypus, cached styles:              {cached:8.1f} payslips/s")
+    print(f"canvas, precomputed layout:           {after:8.1f} payslips/s")
+    print(f"speed-up: {after / before:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,419 @@
+// Chart.js for payroll analytics
+document.addEventListener('DOMContentLoaded', function() {
+    const ctx = document.getElementById('payrollChart').getContext('2d');
+
+    // Monthly totals, rendered into the page as JSON
+    const monthlyData = JSON.parse(
+        document.getElementById('monthlyStatsData').textContent);
+    const labels = [];
+    const data = [];
+
+    monthlyData.forEach(function(item) {
+        labels.push(item.month + ' ' + item.year);
+        data.push(item.total_payout || 0);
+    });
+
+    new Chart(ctx, {
+        type: 'bar',
+        data: {
+            labels: labels.reverse(),
+            datasets: [{
+                label: 'Monthly Payout (₹)',
+                data: data.reverse(),
+                backgroundColor: 'rgba(52, 152, 219, 0.8)',
+                borderColor: 'rgba(52, 152, 219, 1)',
+                borderWidth: 1
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            scales: {
+                y: {
+                    beginAtZero: true,
+                    ticks: {
+                        callback: function(value) {
+                            return '₹' + value.toLocaleString();
+                        }
+                    }
+                }
+            },
+            plugins: {
+                legend: {
+                    display: true,
+                    position: 'top'
+                },
+                tooltip: {
+                    callbacks: {
+                        label: function(context) {
+                            return 'Total Payout: ₹' + context.parsed.y.toLocaleString();
+                        }
+                    }
+                }
+            }
+        }
+    });
+});
+
+// Auto-dismiss alerts after 5 seconds
+setTimeout(function() {
+    const alerts = document.querySelectorAll('.alert:not(.alert-persistent)');
+    alerts.forEach(function(alert) {
+        const bsAlert = new bootstrap.Alert(alert);
+        bsAlert.close();
+    });
+}, 5000);
+
+// Poll background jobs started by the last form submission
+function pollJob(alertEl) {
+    const jobId = alertEl.dataset.jobId;
+    const messageEl = alertEl.querySelector('.job-message');
+    const barEl = alertEl.querySelector('.progress-bar');
+
+    fetch(`/api/jobs/${jobId}`)
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                messageEl.textContent = 'Error loading job status: ' + data.message;
+                return;
+            }
+
+            const job = data.job;
+            if (job.status === 'queued' || job.status === 'running') {
+                const processed = job.done + job.failed;
+                if (job.total) {
+                    barEl.style.width = `${Math.min(100, processed * 100 / job.total)}%`;
+                }
+                messageEl.innerHTML = `<i class="fas fa-spinner fa-spin"></i> ` +
+                    (job.status === 'queued' ? 'Job queued...' :
+                     `Processing: ${job.done} done, ${job.failed} failed` +
+                     (job.remaining !== null ? `, ${job.remaining} remaining` : '') +
+                     (job.throughput ? ` (${Math.round(job.throughput * 60)}/min)` : ''));
+                setTimeout(() => pollJob(alertEl), 2000);
+                return;
+            }
+
+            barEl.style.width = '100%';
+            if (job.status === 'failed') {
+                alertEl.classList.replace('alert-info', 'alert-danger');
+                messageEl.textContent = 'Job failed: ' + job.error;
+                return;
+            }
+
+            alertEl.classList.replace('alert-info', job.failed ? 'alert-warning' : 'alert-success');
+            messageEl.textContent = job.result.message;
+            if (job.result.rejects_url) {
+                const link = document.createElement('a');
+                link.href = job.result.rejects_url;
+                link.className = 'alert-link ms-1';
+                link.textContent = 'Download the rejected rows';
+                messageEl.appendChild(link);
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            setTimeout(() => pollJob(alertEl), 5000);
+        });
+}
+
+document.querySelectorAll('.job-status').forEach(pollJob);
+
+// View payslip function
+function viewPayslip(empId, month, year) {
+    fetch(`/api/payslip/${empId}/${month}/${year}`, { cache: 'no-cache' })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                document.getElementById('payslipContent').innerHTML = data.html;
+                document.getElementById('downloadPayslipBtn').onclick = function() {
+                    window.open(`/download_payslip/${empId}/${month}/${year}`, '_blank');
+                };
+                new bootstrap.Modal(document.getElementById('payslipModal')).show();
+            } else {
+                alert('Error loading payslip: ' + data.message);
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('Error loading payslip');
+        });
+}
+
+// Cursor for the page after the rows already in the table
+let nextPayrollCursor = null;
+
+// Load payrolls with filtering; more appends the next page
+function loadAllPayrolls(more) {
+    const month = document.getElementById('monthFilter').value;
+    const year = document.getElementById('yearFilter').value;
+
+    let url = '/api/payrolls';
+    const params = new URLSearchParams();
+    if (month) params.append('month', month);
+    if (year) params.append('year', year);
+    if (more === true && nextPayrollCursor) params.append('after', nextPayrollCursor);
+    if (params.toString()) url += '?' + params.toString();
+
+    // Always revalidate, so a refresh right after processing payroll
+    // is never served from the browser cache; unchanged data is a 304
+    fetch(url, { cache: 'no-cache' })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                updatePayrollTable(data.payrolls, more === true);
+                nextPayrollCursor = data.next_cursor;
+                document.getElementById('loadMorePayrolls').style.display =
+                    nextPayrollCursor ? '' : 'none';
+            } else {
+                alert('Error loading payrolls: ' + data.message);
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('Error loading payrolls');
+        });
+}
+
+function updatePayrollTable(payrolls, append) {
+    const tbody = document.getElementById('payrollTableBody');
+    if (!append) tbody.innerHTML = '';
+
+    payrolls.forEach(payroll => {
+        const row = `
+            <tr>
+                <td>${payroll.emp_id}</td>
+                <td>${payroll.name}</td>
+                <td>${payroll.month} ${payroll.year}</td>
+                <td>${payroll.days_worked} days</td>
+                <td>₹${parseFloat(payroll.gross_salary).toFixed(2)}</td>
+                <td>₹${parseFloat(payroll.net_salary).toFixed(2)}</td>
+                <td>
+                    <button class="btn btn-sm btn-primary-custom" onclick="viewPayslip('${payroll.emp_id}', '${payroll.month}', ${payroll.year})">
+                        <i class="fas fa-eye"></i> View
+                    </button>
+                    <a href="/download_payslip/${payroll.emp_id}/${payroll.month}/${payroll.year}" class="btn btn-sm btn-success-custom">
+                        <i class="fas fa-download"></i> PDF
+                    </a>
+                </td>
+            </tr>
+        `;
+        tbody.innerHTML += row;
+    });
+}
+
+// Add event listeners for filters
+document.getElementById('monthFilter').addEventListener('change', loadAllPayrolls);
+document.getElementById('yearFilter').addEventListener('change', loadAllPayrolls);
+
+function escapeHtml(value) {
+    const div = document.createElement('div');
+    div.textContent = value == null ? '' : value;
+    return div.innerHTML;
+}
+
+// Page through /api/employees, optionally filtered by ID/name prefix
+function fetchEmployees(search, after, limit) {
+    const params = new URLSearchParams();
+    if (search) params.append('q', search);
+    if (after) params.append('after', after);
+    if (limit) params.append('limit', limit);
+    return fetch('/api/employees?' + params.toString())
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                throw new Error(data.message);
+            }
+            return data;
+        });
+}
+
+// Typeahead employee pickers: suggestions are fetched as the user types
+function attachEmployeePicker(input) {
+    const options = document.getElementById(input.getAttribute('list'));
+    let timer = null;
+
+    function loadSuggestions() {
+        fetchEmployees(input.value.trim(), null, 20)
+            .then(data => {
+                options.innerHTML = '';
+                data.employees.forEach(emp => {
+                    const option = document.createElement('option');
+                    option.value = emp.emp_id;
+                    option.textContent = `${emp.emp_id} - ${emp.name}` +
+                        (input.dataset.showCtc ? ` (Current: ₹${Math.round(emp.ctc_monthly)})` : '');
+                    options.appendChild(option);
+                });
+            })
+            .catch(error => console.error('Error:', error));
+    }
+
+    input.addEventListener('focus', loadSuggestions, { once: true });
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        timer = setTimeout(loadSuggestions, 200);
+    });
+}
+
+document.querySelectorAll('.employee-picker').forEach(attachEmployeePicker);
+
+// All Employees modal: loaded lazily, one page at a time
+let allEmployeesCursor = null;
+
+function loadAllEmployees(reset) {
+    const tbody = document.getElementById('allEmployeesTableBody');
+    const moreBtn = document.getElementById('allEmployeesMoreBtn');
+    const search = document.getElementById('allEmployeesSearch').value.trim();
+
+    fetchEmployees(search, reset ? null : allEmployeesCursor)
+        .then(data => {
+            if (reset) tbody.innerHTML = '';
+            data.employees.forEach(emp => {
+                tbody.insertAdjacentHTML('beforeend', `
+                    <tr>
+                        <td>${escapeHtml(emp.emp_id)}</td>
+                        <td>${escapeHtml(emp.name)}</td>
+                        <td>${escapeHtml(emp.email)}</td>
+                        <td>${escapeHtml(emp.designation || 'N/A')}</td>
+                        <td>${escapeHtml(emp.department || 'N/A')}</td>
+                        <td>₹${parseFloat(emp.ctc_monthly).toFixed(2)}</td>
+                        <td>
+                            ${emp.pf_opted ? '<span class="badge bg-success">Yes</span>' : '<span class="badge bg-danger">No</span>'}
+                        </td>
+                        <td>${escapeHtml(emp.joining_date || 'N/A')}</td>
+                    </tr>
+                `);
+            });
+            allEmployeesCursor = data.next_cursor;
+            moreBtn.classList.toggle('d-none', !allEmployeesCursor);
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('Error loading employees');
+        });
+}
+
+let allEmployeesSearchTimer = null;
+document.getElementById('allEmployeesModal').addEventListener('show.bs.modal', function() {
+    loadAllEmployees(true);
+});
+document.getElementById('allEmployeesMoreBtn').addEventListener('click', function() {
+    loadAllEmployees(false);
+});
+document.getElementById('allEmployeesSearch').addEventListener('input', function() {
+    clearTimeout(allEmployeesSearchTimer);
+    allEmployeesSearchTimer = setTimeout(function() { loadAllEmployees(true); }, 200);
+});
+
+// View employee cost breakdown
+function viewEmployeeCostBreakdown(empId, name, ctcMonthly) {
+    const breakdown = calculateSalaryBreakdown(ctcMonthly);
+
+    const costHtml = `
+        <div class="cost-breakdown-container">
+            <div class="employee-header" style="text-align: center; margin-bottom: 30px; padding: 20px; background: linear-gradient(135deg, #2c3e50 0%, #3498db 100%); color: white; border-radius: 8px;">
+                <h3 style="margin: 0;">${name} (${empId})</h3>
+                <p style="margin: 5px 0 0 0; opacity: 0.9;">Monthly CTC: ₹${ctcMonthly.toFixed(2)}</p>
+            </div>
+
+            <div class="cost-table" style="background: white; border: 1px solid #ddd; border-radius: 8px; overflow: hidden;">
+                <div class="section-header" style="background: #2c3e50; color: white; padding: 15px; text-align: center;">
+                    <h4 style="margin: 0;">SALARY STRUCTURE</h4>
+                </div>
+
+                <table style="width: 100%; border-collapse: collapse;">
+                    <thead>
+                        <tr style="background: #3498db; color: white;">
+                            <th style="padding: 12px; text-align: left; border: 1px solid #ddd;">Component</th>
+                            <th style="padding: 12px; text-align: right; border: 1px solid #ddd;">Amount (₹)</th>
+                            <th style="padding: 12px; text-align: right; border: 1px solid #ddd;">Percentage</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+                        <tr><td style="padding: 10px; border: 1px solid #ddd;">Basic Salary</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">₹${breakdown.basic_salary.toFixed(2)}</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">40%</td></tr>
+                        <tr><td style="padding: 10px; border: 1px solid #ddd;">HRA</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">₹${breakdown.hra.toFixed(2)}</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">20%</td></tr>
+                        <tr><td style="padding: 10px; border: 1px solid #ddd;">Travel Allowance</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">₹${breakdown.travel_allowance.toFixed(2)}</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">10%</td></tr>
+                        <tr><td style="padding: 10px; border: 1px solid #ddd;">Medical Allowance</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">₹${breakdown.medical_allowance.toFixed(2)}</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">5%</td></tr>
+                        <tr><td style="padding: 10px; border: 1px solid #ddd;">LTA</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">₹${breakdown.lta.toFixed(2)}</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">8%</td></tr>
+                        <tr><td style="padding: 10px; border: 1px solid #ddd;">Special Allowance</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">₹${breakdown.special_allowance.toFixed(2)}</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">17%</td></tr>
+                        <tr style="background: #e8f5e8; font-weight: bold;"><td style="padding: 12px; border: 1px solid #ddd;">GROSS SALARY</td><td style="padding: 12px; text-align: right; border: 1px solid #ddd;">₹${breakdown.gross_salary.toFixed(2)}</td><td style="padding: 12px; text-align: right; border: 1px solid #ddd;">100%</td></tr>
+                        <tr><td style="padding: 10px; border: 1px solid #ddd; color: #e74c3c; font-weight: bold;">Potential Deductions:</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;"></td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;"></td></tr>
+                        <tr><td style="padding: 10px; border: 1px solid #ddd; padding-left: 30px;">PF Contribution (12%)</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd; color: #e74c3c;">₹${breakdown.pf_deduction.toFixed(2)}</td><td style="padding: 10px; text-align: right; border: 1px solid #ddd;">-12%</td></tr>
+                        <tr style="background: #2c3e50; color: white; font-weight: bold; font-size: 1.1em;"><td style="padding: 15px; border: 1px solid #ddd;">POTENTIAL NET SALARY</td><td style="padding: 15px; text-align: right; border: 1px solid #ddd;">₹${breakdown.net_salary.toFixed(2)}</td><td style="padding: 15px; text-align: right; border: 1px solid #ddd;">88%</td></tr>
+                    </tbody>
+                </table>
+            </div>
+
+            <div style="margin-top: 20px; padding: 15px; background: #fff3cd; border: 1px solid #ffeaa7; border-radius: 8px;">
+                <i class="fas fa-info-circle"></i> <strong>Note:</strong> This is the salary structure breakdown. Actual deductions may vary based on PF opt-in, attendance, and other factors.
+            </div>
+        </div>
+    `;
+
+    document.getElementById('employeeCostContent').innerHTML = costHtml;
+    new bootstrap.Modal(document.getElementById('employeeCostModal')).show();
+}
+
+// Download report function
+function downloadReport(format) {
+    const month = document.getElementById('monthFilter').value;
+    const year = document.getElementById('yearFilter').value;
+
+    if (!month || !year) {
+        alert('Please select both month and year to download report');
+        return;
+    }
+
+    const query = format ? `?format=${format}` : '';
+    window.open(`/download_report/${month}/${year}${query}`, '_blank');
+}
+
+// Download every payslip for the selected month as a ZIP
+function downloadPayslips() {
+    const month = document.getElementById('monthFilter').value;
+    const year = document.getElementById('yearFilter').value;
+
+    if (!month || !year) {
+        alert('Please select both month and year to download payslips');
+        return;
+    }
+
+    window.location.href = `/download_payslips/${month}/${year}.zip`;
+}
+
+// Download the month's payslips merged into one PDF
+function downloadPayslipRegister() {
+    const month = document.getElementById('monthFilter').value;
+    const year = document.getElementById('yearFilter').value;
+
+    if (!month || !year) {
+        alert('Please select both month and year to download the payslip register');
+        return;
+    }
+
+    window.open(`/download_payslip_register/${month}/${year}`, '_blank');
+}
+
+// Helper function to calculate salary breakdown
+function calculateSalaryBreakdown(ctcMonthly) {
+    const basic_salary = ctcMonthly * 0.40;
+    const hra = ctcMonthly * 0.20;
+    const travel_allowance = ctcMonthly * 0.10;
+    const medical_allowance = ctcMonthly * 0.05;
+    const lta = ctcMonthly * 0.08;
+    const special_allowance = ctcMonthly * 0.17;
+    const gross_salary = basic_salary + hra + travel_allowance + medical_allowance + lta + special_allowance;
+    const pf_deduction = basic_salary * 0.12;
+    const net_salary = gross_salary - pf_deduction;
+
+    return {
+        basic_salary,
+        hra,
+        travel_allowance,
+        medical_allowance,
+        lta,
+        special_allowance,
+        gross_salary,
+        pf_deduction,
+        net_salary
+    };
+}